@@ -117,4 +117,9 @@ setup(
     maintainer_email=MAINTAINER_EMAIL,
     license=LICENSE,
     classifiers=CLASSIFIERS,
-    packages=find_packages())
+    packages=find_packages(),
+    entry_points={
+        'console_scripts': [
+            'vad_watch = vad.vad_watch:main',
+            'vad_batch = vad.vad_batch:main',
+            'vad_sites = vad.vad_sites:main']})
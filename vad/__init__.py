@@ -6,14 +6,58 @@ VAD
 VAD functions for creating a vad profile and for plotting.
 
     vad
+    read_radar
     quicklooks
+    quicklooks_batch
+    open_vad
+    Catalog
+    adaptive_heights
     get_metadata
     get_plot_values
- 
+
+The functions are imported from their submodules on first use, so
+plotting does not import pyart and retrieval does not import matplotlib
+through this package.
+
  """
 
-from .vad_profile import vad
-from .vad_quicklooks import quicklooks
-from .config import get_metadata, get_plot_values
+import importlib
+import sys
+import types
+
+_LAZY_ATTRIBUTES = {
+    'vad': 'vad_profile',
+    'read_radar': 'vad_profile',
+    'quicklooks': 'vad_quicklooks',
+    'quicklooks_batch': 'vad_quicklooks',
+    'open_vad': 'vad_reader',
+    'Catalog': 'vad_catalog',
+    'adaptive_heights': 'vad_heights',
+    'get_metadata': 'config',
+    'get_plot_values': 'config',
+}
+
+
+class _LazyModule(types.ModuleType):
+    """ The vad package, importing its functions on first access. """
+
+    def __getattr__(self, name):
+        if name not in _LAZY_ATTRIBUTES:
+            raise AttributeError("module 'vad' has no attribute '"
+                                 + name + "'")
+        module = importlib.import_module('.' + _LAZY_ATTRIBUTES[name],
+                                         __name__)
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(super(_LazyModule, self).__dir__())
+                      | set(_LAZY_ATTRIBUTES))
+
+
+# Module __getattr__ (PEP 562) needs Python 3.7, so the class of the
+# package module is swapped instead.
+sys.modules[__name__].__class__ = _LazyModule
 
-__all__ = [s for s in dir() if not s.startswith('_')]
\ No newline at end of file
+__all__ = sorted(_LAZY_ATTRIBUTES)
@@ -4,13 +4,20 @@ vad.config
 VAD Configuration
 
     get_metadata
+    get_encoding
+    get_qc_thresholds
+    get_height_grid
     get_plot_values
 
 """
 
-from .default_config import _DEFAULT_METADATA, _DEFAULT_PLOT_VALUES
+import copy
 
+from .default_config import (_DEFAULT_METADATA, _DEFAULT_ENCODING,
+                             _DEFAULT_PLOT_VALUES, _CHUNK_TIMES,
+                             _DEFAULT_QC_THRESHOLDS, _DEFAULT_HEIGHT_GRID)
 
+_COLORMAPS = {}
 
 
 def get_metadata(radar):
@@ -23,8 +30,63 @@ def get_metadata(radar):
     else:
         return {}
     
+def get_encoding(name, nheight=None):
+    """
+    Return the NetCDF encoding of the wind variables for an encoding name
+    found in default_config, e.g. 'float32' or 'int16'. If nheight is
+    given, chunk sizes for that many heights are added.
+    """
+    encoding = copy.deepcopy(_DEFAULT_ENCODING[name])
+    if nheight is not None:
+        for variable in encoding.values():
+            variable.setdefault('chunksizes', (_CHUNK_TIMES, nheight))
+    return encoding
+
+def get_qc_thresholds(thresholds=None):
+    """
+    Return the quality control thresholds of default_config updated with
+    those in thresholds. Unknown threshold names raise a ValueError.
+    """
+    qc = dict(_DEFAULT_QC_THRESHOLDS)
+    for name, value in (thresholds or {}).items():
+        if name not in qc:
+            raise ValueError('Unknown QC threshold: ' + str(name)
+                             + '. Options are ' + ', '.join(sorted(qc)))
+        qc[name] = value
+    return qc
+
+def get_height_grid(grid=None):
+    """
+    Return the adaptive height grid parameters of default_config updated
+    with those in grid. Unknown parameter names raise a ValueError.
+    """
+    heights = dict(_DEFAULT_HEIGHT_GRID)
+    for name, value in (grid or {}).items():
+        if name not in heights:
+            raise ValueError('Unknown height grid parameter: ' + str(name)
+                             + '. Options are ' + ', '.join(sorted(heights)))
+        heights[name] = value
+    return heights
+
+def _colormap(colors, bounds):
+    """
+    Return the barb colormap and norm of colors and bounds, built on first
+    use so matplotlib is not imported until a radar is plotted.
+    """
+    key = (tuple(colors), tuple(bounds))
+    if key not in _COLORMAPS:
+        import matplotlib.colors
+        cmap = matplotlib.colors.LinearSegmentedColormap.from_list(
+            "vadbarbcolors", list(colors))
+        norm = matplotlib.colors.BoundaryNorm(bounds, cmap.N)
+        _COLORMAPS[key] = (cmap, norm)
+    return _COLORMAPS[key]
+
 def get_plot_values(radar):
     """
     Return the values specific to a radar for plotting the radar fields.
     """
-    return _DEFAULT_PLOT_VALUES[radar].copy()
\ No newline at end of file
+    plot_values = _DEFAULT_PLOT_VALUES[radar].copy()
+    plot_values['cmap'], plot_values['norm'] = _colormap(
+        plot_values['colors'], plot_values['bounds'])
+    return plot_values
\ No newline at end of file
@@ -71,6 +71,87 @@ _DEFAULT_METADATA = {
         'input_datastream' : 'sgpadicmac2I6.c1'}
 }
 
+###########################################################################
+# Default output encoding
+#
+# The DEFAULT_ENCODING dictionary contains named NetCDF encodings for the
+# (time, height) wind variables written by vad.write. 'float32' stores the
+# winds as compressed float32. 'int16' packs them into scaled integers,
+# 0.01 m/s for the components and speed and 0.01 degree for direction
+# stored about a 180 degree offset, with missing values written as
+# -32768, outside the packed range of valid winds. Chunks hold CHUNK_TIMES full profiles
+# so appending along time and reading whole profiles touch few chunks.
+###########################################################################
+
+_CHUNK_TIMES = 48
+
+_DEFAULT_ENCODING = {
+    'float32': {
+        'u_wind': {'dtype': 'float32', 'zlib': True, 'shuffle': True,
+                   'complevel': 4},
+        'v_wind': {'dtype': 'float32', 'zlib': True, 'shuffle': True,
+                   'complevel': 4},
+        'speed': {'dtype': 'float32', 'zlib': True, 'shuffle': True,
+                  'complevel': 4},
+        'direction': {'dtype': 'float32', 'zlib': True, 'shuffle': True,
+                      'complevel': 4}},
+
+    'int16': {
+        'u_wind': {'dtype': 'int16', 'scale_factor': 0.01,
+                   '_FillValue': -32768, 'zlib': True, 'shuffle': True,
+                   'complevel': 4},
+        'v_wind': {'dtype': 'int16', 'scale_factor': 0.01,
+                   '_FillValue': -32768, 'zlib': True, 'shuffle': True,
+                   'complevel': 4},
+        'speed': {'dtype': 'int16', 'scale_factor': 0.01,
+                  '_FillValue': -32768, 'zlib': True, 'shuffle': True,
+                  'complevel': 4},
+        'direction': {'dtype': 'int16', 'scale_factor': 0.01,
+                      'add_offset': 180.0, '_FillValue': -32768,
+                      'zlib': True, 'shuffle': True, 'complevel': 4}}
+}
+
+###########################################################################
+# Default quality control
+#
+# The DEFAULT_QC_THRESHOLDS dictionary contains the limits applied to each
+# height of a VAD profile when quality control is enabled. 'min_gates' is
+# the least number of valid velocity gates in the fits of a height,
+# 'max_rms' the largest RMS residual (m/s) of the radial velocity fits and
+# 'max_azimuth_gap' the largest gap (degrees) between valid rays of any fit.
+# QC_FLAGS gives the qc_flag bit set for each failed test, and QC_FIELDS
+# the per height statistics stored next to the winds.
+###########################################################################
+
+_DEFAULT_QC_THRESHOLDS = {
+    'min_gates': 50,
+    'max_rms': 5.0,
+    'max_azimuth_gap': 90.0}
+
+_QC_FLAGS = (('no_fit', 1),
+             ('too_few_gates', 2),
+             ('high_rms', 4),
+             ('large_azimuth_gap', 8))
+
+_QC_FIELDS = ('fit_rms', 'valid_gates', 'azimuth_gap', 'qc_flag')
+
+###########################################################################
+# Default adaptive height grid
+#
+# The DEFAULT_HEIGHT_GRID dictionary describes the heights (m) used when
+# z_want='adaptive'. Levels start 'surface_spacing' apart at 'bottom', each
+# spacing is 'growth' times the one below it up to 'max_spacing', and no
+# level lies above 'top'. This keeps the boundary layer resolution of a
+# dense grid with far fewer, mostly empty, levels aloft.
+###########################################################################
+
+_DEFAULT_HEIGHT_GRID = {
+    'bottom': 0.0,
+    'top': 10000.0,
+    'surface_spacing': 50.0,
+    'max_spacing': 500.0,
+    'growth': 1.1}
+
 ###########################################################################
 # Default plot values
 #
@@ -80,20 +161,19 @@ _DEFAULT_METADATA = {
 # radars. These values are all used within vad_quicklooks.py.
 ###########################################################################
 import numpy as np
-import matplotlib
 
-cmap = matplotlib.colors.LinearSegmentedColormap.from_list(
-    "vadbarbcolors", ['black', 'cyan', 'blue', 
-                      'darkblue', 'lime', 'green',
-                      'darkgreen', 'yellow', 'orange', 
-                      'darkorange', 'red', 'firebrick', 
-                      'maroon', 'purple', 'mediumpurple', 
-                      'rebeccapurple', 'hotpink', 'deeppink', 
-                      'magenta', 'pink', 'gray'])
+# The colormap and norm of the barbs are built from these colors and
+# bounds by get_plot_values, so matplotlib is only imported when plotting.
+_BARB_COLORS = ['black', 'cyan', 'blue', 
+                'darkblue', 'lime', 'green',
+                'darkgreen', 'yellow', 'orange', 
+                'darkorange', 'red', 'firebrick', 
+                'maroon', 'purple', 'mediumpurple', 
+                'rebeccapurple', 'hotpink', 'deeppink', 
+                'magenta', 'pink', 'gray']
 
 bounds = np.arange(0, 105, 5)
 ticks = np.arange(5, 105, 5)
-norm = matplotlib.colors.BoundaryNorm(bounds, cmap.N)
 
 _DEFAULT_PLOT_VALUES = {
     # X_SAPR I4 VAD plot values
@@ -101,28 +181,25 @@ _DEFAULT_PLOT_VALUES = {
         'save_name': 'sgpxsaprvadI4.c1',
         'facility': 'I4',
         'title': 'SGP X-SAPR I4 VAD Profile ',
-        'cmap': cmap,
+        'colors': _BARB_COLORS,
         'bounds': bounds,
-        'ticks': ticks,
-        'norm': norm},
+        'ticks': ticks},
     
     # X-SAPR I5 VAD plot values
     'xsaprvadI5':{
         'save_name': 'sgpxsaprvadI5.c1',
         'facility': 'I5',
         'title': 'SGP X-SAPR I5 VAD Profile ',
-        'cmap': cmap,
+        'colors': _BARB_COLORS,
         'bounds': bounds,
-        'ticks': ticks,
-        'norm': norm},
+        'ticks': ticks},
     
     # X-SAPR I6 VAD plot values
     'xsaprvadI6':{
         'save_name': 'sgpxsaprvadI6.c1',
         'facility': 'I6',
         'title': 'SGP X-SAPR I6 VAD Profile ',
-        'cmap': cmap,
+        'colors': _BARB_COLORS,
         'bounds': bounds,
-        'ticks': ticks,
-        'norm': norm}
-}
\ No newline at end of file
+        'ticks': ticks}
+}
@@ -0,0 +1,99 @@
+"""
+vad.testing
+===========
+Synthetic radar volumes with known winds for tests and benchmarks.
+
+    wind_profile
+    make_volume
+    make_volumes
+
+"""
+
+import datetime
+import os
+
+import numpy as np
+import pyart
+
+
+def wind_profile(height):
+    """
+    Analytic wind profile used by default, u and v (m/s) at height (m).
+    Both components vary linearly with height and the wind veers with
+    height, so a retrieval that mixes heights or azimuths is caught.
+    """
+    height = np.asarray(height, dtype='float64')
+    return 5.0 + 2e-3 * height, 10.0 - 1e-3 * height
+
+
+def make_volume(filename, time, u_wind=5.0, v_wind=10.0,
+                vel_field='corrected_velocity', ngates=200, nrays=72,
+                fixed_angles=(4.0, 8.0, 12.0), gate_spacing=50.0):
+    """
+    Writes a synthetic CF/Radial PPI volume with a horizontally uniform
+    wind to filename and returns the file path.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the CF/Radial file.
+    time : datetime
+        Volume start time.
+    u_wind, v_wind : float or callable, optional
+        Wind components in m/s, either constants or functions of the gate
+        height in meters, e.g. those of wind_profile.
+    vel_field : str, optional
+        Name of the radial velocity field.
+    ngates, nrays : int, optional
+        Gates per ray and rays per sweep, evenly spaced in azimuth.
+    fixed_angles : sequence, optional
+        Elevation of every sweep in degrees.
+    gate_spacing : float, optional
+        Gate spacing in meters.
+
+    """
+    nsweeps = len(fixed_angles)
+    radar = pyart.testing.make_empty_ppi_radar(ngates, nrays, nsweeps)
+    radar.range['data'] = ((np.arange(ngates, dtype='float32') + 0.5)
+                           * gate_spacing)
+    radar.fixed_angle['data'] = np.array(fixed_angles, dtype='float32')
+    radar.elevation['data'] = np.repeat(radar.fixed_angle['data'], nrays)
+    radar.azimuth['data'] = np.tile(
+        np.arange(nrays, dtype='float32') * 360.0 / nrays, nsweeps)
+    radar.time['units'] = ('seconds since '
+                           + time.strftime('%Y-%m-%dT%H:%M:%SZ'))
+    radar.init_gate_x_y_z()
+
+    if callable(u_wind):
+        u_wind = u_wind(radar.gate_z['data'])
+    if callable(v_wind):
+        v_wind = v_wind(radar.gate_z['data'])
+    azimuth = np.deg2rad(radar.azimuth['data'])[:, np.newaxis]
+    elevation = np.deg2rad(radar.elevation['data'])[:, np.newaxis]
+    velocity = ((u_wind * np.sin(azimuth) + v_wind * np.cos(azimuth))
+                * np.cos(elevation) * np.ones((1, radar.ngates)))
+    radar.add_field(vel_field, {'data': np.ma.masked_invalid(velocity),
+                                'units': 'meters_per_second'})
+    radar.add_field('reflectivity', {'data': np.ma.zeros(velocity.shape),
+                                     'units': 'dBZ'})
+    pyart.io.write_cfradial(filename, radar)
+    return filename
+
+
+def make_volumes(directory, nvolumes, start=None,
+                 interval=datetime.timedelta(minutes=5),
+                 input_datastream='sgpxsaprcmacsurI5.c1', **kwargs):
+    """
+    Writes nvolumes synthetic volumes, interval apart from start, with
+    ARM file names to directory and returns their sorted paths. kwargs are
+    passed on to make_volume. start defaults to 2017-10-05 00:00.
+    """
+    if start is None:
+        start = datetime.datetime(2017, 10, 5)
+    files = []
+    for i in range(nvolumes):
+        time = start + i * interval
+        filename = os.path.join(directory, input_datastream + '.'
+                                + time.strftime('%Y%m%d.%H%M%S') + '.nc')
+        files.append(make_volume(filename, time, **kwargs))
+    return files
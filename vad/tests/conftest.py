@@ -0,0 +1,13 @@
+"""
+Shared fixtures for the SAPR-VAD-VAP unit tests.
+"""
+
+import pytest
+
+from vad.testing import make_volumes
+
+
+@pytest.fixture
+def radar_files(tmp_path):
+    """ Four synthetic volumes on 2017-10-05 at a 5 minute cadence. """
+    return make_volumes(str(tmp_path), 4)
@@ -0,0 +1,112 @@
+"""
+Benchmarks of the VAD retrieval, write and quicklooks on synthetic volumes
+with a known wind profile. Requires pytest-benchmark, run with
+``pytest vad/tests/test_benchmarks.py --benchmark-only``.
+
+The volume sizes run are chosen with the VAD_BENCHMARK_SIZES environment
+variable, a comma separated list of the SIZES keys, by default 'small',
+e.g. ``VAD_BENCHMARK_SIZES=small,medium,large``.
+"""
+
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+import vad
+from vad.testing import make_volumes, wind_profile
+from vad.vad_timing import StageTimer
+
+pytest.importorskip('pytest_benchmark')
+
+SIZES = {
+    'small': {'nvolumes': 4, 'ngates': 200, 'nrays': 72,
+              'fixed_angles': (4.0, 8.0, 12.0)},
+    'medium': {'nvolumes': 12, 'ngates': 500, 'nrays': 360,
+               'fixed_angles': (2.0, 4.0, 6.0, 8.0, 10.0, 12.0)},
+    'large': {'nvolumes': 48, 'ngates': 1000, 'nrays': 360,
+              'fixed_angles': (1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0,
+                               12.0, 15.0)},
+}
+_SELECTED = os.environ.get('VAD_BENCHMARK_SIZES', 'small').split(',')
+
+Z_WANT = np.linspace(0, 2000, 41)
+CONFIG = 'xsaprvadI5'
+
+
+def _analytic_u(height):
+    return wind_profile(height)[0]
+
+
+def _analytic_v(height):
+    return wind_profile(height)[1]
+
+
+def _assert_truth(day):
+    """ The retrieved winds match the analytic profile at every height. """
+    u_wind, v_wind = wind_profile(day.hght)
+    for uwind, vwind in zip(day.uwind, day.vwind):
+        assert_allclose(uwind, u_wind, atol=0.1)
+        assert_allclose(vwind, v_wind, atol=0.1)
+
+
+@pytest.fixture(scope='module', params=_SELECTED)
+def volumes(request, tmp_path_factory):
+    """ Synthetic volumes of the selected size with the analytic winds. """
+    size = dict(SIZES[request.param])
+    directory = str(tmp_path_factory.mktemp(request.param))
+    return make_volumes(directory, size.pop('nvolumes'),
+                        u_wind=_analytic_u, v_wind=_analytic_v, **size)
+
+
+@pytest.mark.parametrize('engine', ['pyart', 'native'])
+def test_bench_retrieval(benchmark, volumes, engine):
+    day = benchmark.pedantic(vad.vad, args=(volumes,),
+                             kwargs={'z_want': Z_WANT, 'engine': engine},
+                             rounds=3, iterations=1)
+    benchmark.extra_info.update(day.timing.report()['stages'])
+    _assert_truth(day)
+
+
+@pytest.mark.parametrize('grid', ['dense', 'adaptive'])
+def test_bench_height_grid(benchmark, volumes, grid):
+    # The default dense grid against the adaptive grid trimmed to the scans
+    if grid == 'dense':
+        kwargs = {'z_want': np.linspace(0, 10000, 100)}
+    else:
+        kwargs = {'z_want': 'adaptive', 'trim': True}
+    day = benchmark.pedantic(vad.vad, args=(volumes,),
+                             kwargs=dict(kwargs, engine='native'),
+                             rounds=3, iterations=1)
+    benchmark.extra_info['nheight'] = len(day.hght)
+    valid = ~np.ma.getmaskarray(day.uwind)
+    u_wind = wind_profile(day.hght)[0] + np.zeros(day.uwind.shape)
+    assert_allclose(day.uwind[valid], u_wind[valid], atol=0.5)
+
+
+def test_bench_write(benchmark, volumes, tmp_path):
+    day = vad.vad(volumes, z_want=Z_WANT, engine='native')
+    path = benchmark(day.write, CONFIG, str(tmp_path))
+    benchmark.extra_info['bytes'] = os.path.getsize(path)
+
+
+def test_bench_quicklooks(benchmark, volumes, tmp_path):
+    day = vad.vad(volumes, z_want=Z_WANT, engine='native')
+    path = day.write(CONFIG, str(tmp_path))
+    timer = StageTimer()
+    benchmark.pedantic(vad.quicklooks, args=(path, CONFIG, str(tmp_path)),
+                       kwargs={'timer': timer}, rounds=3, iterations=1)
+    benchmark.extra_info.update(timer.report()['stages'])
+
+
+def test_bench_end_to_end(benchmark, volumes, tmp_path):
+    def run():
+        day = vad.vad(volumes, z_want=Z_WANT, engine='native')
+        path = day.write(CONFIG, str(tmp_path))
+        vad.quicklooks(path, CONFIG, str(tmp_path), timer=day.timing)
+        return day
+
+    day = benchmark.pedantic(run, rounds=3, iterations=1)
+    benchmark.extra_info.update(day.timing.report()['stages'])
+    _assert_truth(day)
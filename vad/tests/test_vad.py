@@ -3,28 +3,37 @@ Unit Tests for SAPR-VAD-VAP vad.quicklooks
 and vad.vad modules. 
 """
 
+import datetime
+
 import numpy as np
-from numpy.testing import assert_equal
+import pytest
+from numpy.testing import assert_allclose, assert_equal
 import vad
-import glob
+from vad.testing import make_volumes, wind_profile
+import xarray
 import os
 
-def test_vad_profile():
-    # Test vad.vad
-    input_files = glob.glob('./vad/tests/2017*', recursive=True)
-    input_files.sort()
+def test_vad_profile(tmp_path):
+    # Test vad.vad recovers an analytic wind profile and writes the day
+    input_files = make_volumes(
+        str(tmp_path), 4, u_wind=lambda z: wind_profile(z)[0],
+        v_wind=lambda z: wind_profile(z)[1])
 
     vel_field = 'corrected_velocity'
-    z_want = np.linspace(0, 10000, 101)
+    z_want = np.linspace(0, 2000, 21)
     config = 'xsaprvadI5'
-    outdir = '.'
+    outdir = str(tmp_path)
 
     test_vad = vad.vad(
         files=input_files, vel_field=vel_field, z_want=z_want)
 
-    test_vad.write(file_directory=outdir, config=config)
+    path = test_vad.write(file_directory=outdir, config=config)
 
-    assert_equal(os.path.exists('sgpxsaprvadI5.c1.20171005.000000.nc'), True)
+    assert_equal(os.path.basename(path),
+                 'sgpxsaprvadI5.c1.20171005.000000.nc')
+    u_wind, v_wind = wind_profile(z_want)
+    assert_allclose(test_vad.uwind, np.tile(u_wind, (4, 1)), atol=0.1)
+    assert_allclose(test_vad.vwind, np.tile(v_wind, (4, 1)), atol=0.1)
 
 def test_vad_quicklooks():
     # Test vad.quicklooks
@@ -35,3 +44,179 @@ def test_vad_quicklooks():
     vad.quicklooks(input_file, config, outdir)
 
     assert_equal(os.path.exists('sgpxsaprvadI5.c1.20171005.000000.png'), True)
+
+def test_vad_profile_parallel(radar_files):
+    # Test vad.vad with a process pool matches the serial retrieval
+    z_want = np.linspace(0, 2000, 21)
+    serial = vad.vad(radar_files, z_want=z_want)
+    parallel = vad.vad(radar_files[::-1], z_want=z_want, n_workers=2)
+
+    assert_equal(parallel.t, serial.t)
+    assert_equal(parallel.uwind, serial.uwind)
+    assert_equal(parallel.vwind, serial.vwind)
+
+
+def test_vad_profile_spill(radar_files, tmp_path):
+    # Test spilling chunks of profiles writes the same file as vad.write
+    z_want = np.linspace(0, 2000, 21)
+    in_memory = vad.vad(radar_files, z_want=z_want)
+    path = in_memory.write(config='xsaprvadI5', file_directory=str(tmp_path))
+    expected = xarray.open_dataset(path)
+
+    spill_dir = tmp_path / 'spill'
+    spill_dir.mkdir()
+    spilled = vad.vad(radar_files, z_want=z_want, chunk_size=3,
+                      spill_config='xsaprvadI5',
+                      file_directory=str(spill_dir))
+    assert_equal(len(spilled.t), 0)
+
+    with xarray.open_dataset(str(spill_dir / os.path.basename(path))) as ds:
+        assert_equal(ds.time.data, expected.time.data)
+        assert_allclose(ds.u_wind.data, expected.u_wind.data)
+        assert_allclose(ds.direction.data, expected.direction.data)
+    expected.close()
+
+def test_vad_spill_days(tmp_path):
+    # Test spilled and appended profiles go to the daily file of each date
+    files = make_volumes(str(tmp_path), 2,
+                         start=datetime.datetime(2017, 10, 5, 23, 50))
+    files += make_volumes(str(tmp_path), 3,
+                          start=datetime.datetime(2017, 10, 6))
+    spill_dir = tmp_path / 'spill'
+    spill_dir.mkdir()
+    vad.vad(files, z_want=np.linspace(0, 2000, 21), engine='native',
+            chunk_size=3, spill_config='xsaprvadI5',
+            file_directory=str(spill_dir))
+    names = ['sgpxsaprvadI5.c1.20171005.000000.nc',
+             'sgpxsaprvadI5.c1.20171006.000000.nc']
+    assert_equal(sorted(os.listdir(str(spill_dir))), names)
+    for name, count in zip(names, [2, 3]):
+        with xarray.open_dataset(str(spill_dir / name)) as ds:
+            assert_equal(len(ds.time), count)
+
+    append_dir = tmp_path / 'append'
+    append_dir.mkdir()
+    test_vad = vad.vad(files, z_want=np.linspace(0, 2000, 21),
+                       engine='native')
+    test_vad.write('xsaprvadI5', str(append_dir), append=True)
+    paths = test_vad.write('xsaprvadI5', str(append_dir), append=True)
+    assert_equal([os.path.basename(path) for path in paths], names)
+    with xarray.open_dataset(paths[1]) as ds:
+        assert_equal(len(ds.time), 3)
+
+def test_read_radar(radar_files):
+    # Test vad.read_radar keeps only the velocity field and chosen sweeps
+    radar = vad.read_radar(radar_files[0], 'corrected_velocity',
+                           sweeps=[0, 2])
+
+    assert_equal(list(radar.fields.keys()), ['corrected_velocity'])
+    assert_equal(radar.nsweeps, 2)
+    assert_equal(radar.fixed_angle['data'], [4.0, 12.0])
+
+def test_vad_write_append(radar_files, tmp_path):
+    # Test appending only writes profiles not already in the daily file
+    z_want = np.linspace(0, 2000, 21)
+    first = vad.vad(radar_files[:2], z_want=z_want)
+    path = first.write(config='xsaprvadI5', file_directory=str(tmp_path))
+
+    update = vad.vad(radar_files[1:], z_want=z_want)
+    assert_equal(update.write(config='xsaprvadI5',
+                              file_directory=str(tmp_path), append=True),
+                 path)
+
+    full = vad.vad(radar_files, z_want=z_want)
+    with xarray.open_dataset(path) as ds:
+        assert_equal(ds.time.data, full.t)
+        assert_allclose(ds.v_wind.data, full.vwind)
+
+def test_vad_quicklooks_background(tmp_path):
+    # Test the speed background renders and no pyplot figures are left open
+    import matplotlib.pyplot as plt
+    path = vad.quicklooks('./vad/tests/example_vad.nc', 'xsaprvadI5',
+                          str(tmp_path), background=True)
+
+    assert_equal(os.path.exists(path), True)
+    assert_equal(plt.get_fignums(), [])
+
+def test_vad_write_encoding(radar_files, tmp_path):
+    # Test the compressed float32 and scaled int16 output encodings
+    import netCDF4
+    z_want = np.linspace(0, 2000, 21)
+    test_vad = vad.vad(radar_files, z_want=z_want)
+    for name, dtype, atol in [('float32', 'float32', 1e-6),
+                              ('int16', 'int16', 0.006)]:
+        directory = tmp_path / name
+        directory.mkdir()
+        path = test_vad.write(config='xsaprvadI5',
+                              file_directory=str(directory), encoding=name)
+        with netCDF4.Dataset(path) as dataset:
+            variable = dataset.variables['u_wind']
+            assert_equal(variable.dtype, np.dtype(dtype))
+            assert_equal(variable.filters()['zlib'], True)
+            assert_equal(variable.chunking(), [48, 21])
+        test_vad.write(config='xsaprvadI5', file_directory=str(directory),
+                       append=True)
+        with xarray.open_dataset(path) as ds:
+            assert_allclose(ds.u_wind.values, test_vad.uwind.filled(np.nan),
+                            atol=atol)
+            assert_allclose(ds.direction.values,
+                            test_vad.dir.filled(np.nan), atol=atol)
+
+def test_vad_write_int16_missing(radar_files, tmp_path):
+    # Test masked heights read back as NaN and -9999 is a valid packed value
+    import warnings
+    test_vad = vad.vad(radar_files[:2], z_want=np.linspace(0, 10000, 21),
+                       engine='native')
+    assert_equal(test_vad.uwind.mask[:, -1].all(), True)
+    test_vad._buffer['direction'][0, 0] = 80.01
+    test_vad.consensus(nvolumes=3)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        path = test_vad.write('xsaprvadI5', str(tmp_path), encoding='int16')
+    appended = vad.vad(radar_files[2:], z_want=np.linspace(0, 10000, 21),
+                       engine='native')
+    appended.write('xsaprvadI5', str(tmp_path), append=True)
+
+    with xarray.open_dataset(path) as ds:
+        for name in ['u_wind', 'v_wind', 'speed', 'direction',
+                     'u_wind_consensus', 'direction_consensus']:
+            assert_equal(np.isnan(ds[name].values[:, -1]).all(), True)
+            assert_equal(np.isfinite(ds[name].values[:2, 0]).all(), True)
+        assert_allclose(ds.direction.values[0, 0], 80.01, atol=0.006)
+        assert_equal(len(ds.time), len(radar_files))
+
+def test_vad_write_qc(radar_files, tmp_path):
+    # Test QC statistics, flags and counts are written and appended
+    z_want = np.linspace(0, 2000, 21)
+    first = vad.vad(radar_files[:2], z_want=z_want, engine='native',
+                    qc={'min_gates': 1000})
+    path = first.write(config='xsaprvadI5', file_directory=str(tmp_path))
+    vad.vad(radar_files, z_want=z_want, engine='native',
+            qc={'min_gates': 1000}).write(
+                config='xsaprvadI5', file_directory=str(tmp_path),
+                append=True)
+
+    with xarray.open_dataset(path) as ds:
+        flags = ds.qc_flag.values
+        assert_equal(len(ds.time), 4)
+        assert_equal((flags & 2) != 0, ds.valid_gates.values < 1000)
+        assert_equal(ds.qc_flag.attrs['flag_counts'],
+                     [np.count_nonzero(flags & bit) for bit in [1, 2, 4, 8]])
+        assert_equal(np.isnan(ds.u_wind.values), flags != 0)
+        assert_equal(ds.qc_flag.attrs['min_gates'], 1000)
+
+    # Masked integer statistics are appended as 0, as when created
+    from vad.vad_profile import _append_profiles
+    later = vad.vad(radar_files[3:], z_want=z_want, engine='native',
+                    qc={'min_gates': 1000})
+    later.t[:] += np.timedelta64(1, 'h')
+    later._buffer['valid_gates'][:, -1] = np.ma.masked
+    later._buffer['qc_flag'][:, -1] = np.ma.masked
+    _append_profiles(path, later.t, later._buffer)
+    with xarray.open_dataset(path) as ds:
+        assert_equal(ds.valid_gates.values[-1, -1], 0)
+        assert_equal(ds.qc_flag.values[-1, -1], 0)
+        assert_equal(ds.valid_gates.dtype, np.int32)
+
+    with pytest.raises(ValueError):
+        vad.vad(radar_files, qc=True)
@@ -0,0 +1,66 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_batch module. """
+
+import datetime
+import os
+
+import netCDF4
+import numpy as np
+from numpy.testing import assert_equal
+
+from vad.testing import make_volume
+from vad.vad_batch import reprocess
+
+
+def test_reprocess_resumes(tmp_path):
+    # Test completed days are recorded and only stale days are redone
+    incoming = tmp_path / 'incoming'
+    output = tmp_path / 'output'
+    incoming.mkdir()
+    output.mkdir()
+    for day in [5, 6]:
+        time = datetime.datetime(2017, 10, day)
+        make_volume(str(incoming / ('sgpadicmac2I5.c1.'
+                                    + time.strftime('%Y%m%d.%H%M%S')
+                                    + '.nc')), time)
+    pattern = str(incoming / '{input_datastream}.{date}*')
+    kwargs = dict(file_directory=str(output), engine='native',
+                  z_want=np.linspace(0, 2000, 21))
+
+    manifest = reprocess('20171005', '20171008', ['xsaprvadI5'], pattern,
+                         **kwargs)
+    assert_equal(sorted(manifest['xsaprvadI5']), ['20171005', '20171006'])
+    assert_equal(os.path.exists(
+        str(output / 'sgpxsaprvadI5.c1.20171006.000000.nc')), True)
+
+    first = manifest['xsaprvadI5']['20171005']['completed']
+    os.remove(str(output / 'sgpxsaprvadI5.c1.20171006.000000.nc'))
+    manifest = reprocess('20171005', '20171008', ['xsaprvadI5'], pattern,
+                         n_workers=2, **kwargs)
+    assert_equal(manifest['xsaprvadI5']['20171005']['completed'], first)
+    assert_equal(os.path.exists(
+        str(output / 'sgpxsaprvadI5.c1.20171006.000000.nc')), True)
+
+
+def test_reprocess_failed_day(tmp_path):
+    # Test a failing day is skipped and the other days are still recorded
+    incoming = tmp_path / 'incoming'
+    incoming.mkdir()
+    for day in [5, 6, 7]:
+        time = datetime.datetime(2017, 10, day)
+        make_volume(str(incoming / ('sgpadicmac2I5.c1.'
+                                    + time.strftime('%Y%m%d.%H%M%S')
+                                    + '.nc')), time)
+    # The header still reads but the full read of the volume fails.
+    with netCDF4.Dataset(str(incoming / 'sgpadicmac2I5.c1.20171006.000000'
+                                        '.nc'), 'a') as dataset:
+        dataset.renameVariable('azimuth', 'bad_azimuth')
+    pattern = str(incoming / '{input_datastream}.{date}*')
+
+    for n_workers in [None, 2]:
+        output = tmp_path / ('output' + str(n_workers))
+        output.mkdir()
+        manifest = reprocess('20171005', '20171008', ['xsaprvadI5'], pattern,
+                             file_directory=str(output), engine='native',
+                             z_want=np.linspace(0, 2000, 21),
+                             n_workers=n_workers)
+        assert_equal(sorted(manifest['xsaprvadI5']), ['20171005', '20171007'])
@@ -0,0 +1,40 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_buffer module. """
+
+import datetime
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from vad.vad_buffer import ProfileBuffer
+
+
+def test_profile_buffer_grow_and_sort():
+    buffer = ProfileBuffer(3, chunk_size=2)
+    start = datetime.datetime(2017, 10, 5)
+    for i in [2, 0, 1]:
+        value = np.ma.masked_equal([i, i, -9999.], -9999.)
+        buffer.append(start + datetime.timedelta(minutes=i),
+                      dict((field, value) for field in buffer.fields))
+
+    assert_equal(len(buffer), 3)
+    assert_equal(buffer['u_wind'].dtype, np.float32)
+    buffer.sort()
+    assert_equal(buffer['u_wind'][:, 0], [0, 1, 2])
+    assert_equal(buffer['v_wind'].mask[:, 2], True)
+
+    buffer.clear()
+    assert_equal(len(buffer), 0)
+    assert_equal(buffer.full, False)
+
+
+def test_profile_buffer_extend():
+    buffer = ProfileBuffer(2, chunk_size=2)
+    times = np.datetime64('2017-10-05') + np.arange(3) * np.timedelta64(
+        5, 'm')
+    values = np.array([[0, 1], [2, np.nan], [4, 5]])
+    buffer.extend(times, dict((field, values) for field in buffer.fields))
+
+    assert_equal(len(buffer), 3)
+    assert_equal(buffer.time, times)
+    assert_equal(buffer['speed'][:, 0], [0, 2, 4])
+    assert_equal(buffer['speed'].mask[:, 1], [False, True, False])
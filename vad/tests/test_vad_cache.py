@@ -0,0 +1,69 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_cache module. """
+
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+import vad
+from vad import vad_profile
+from vad.vad_cache import ResultCache
+
+
+def test_vad_profile_cache(radar_files, tmp_path, monkeypatch):
+    # Test cached results are reused and match a fresh retrieval
+    cache = ResultCache(str(tmp_path / 'cache'))
+    z_want = np.linspace(0, 2000, 21)
+    fresh = vad.vad(radar_files, z_want=z_want, engine='native',
+                    cache=cache)
+    assert_equal(len(os.listdir(cache.directory)), 4)
+
+    def no_read(*args, **kwargs):
+        raise AssertionError('cached files should not be read')
+    monkeypatch.setattr(vad_profile, 'read_radar', no_read)
+    cached = vad.vad(radar_files, z_want=z_want, engine='native',
+                     cache=cache)
+    assert_equal(cached.t, fresh.t)
+    assert_allclose(cached.uwind, fresh.uwind)
+    assert_equal(np.ma.getmaskarray(cached.uwind),
+                 np.ma.getmaskarray(fresh.uwind))
+
+    # A different z_want is a different entry
+    monkeypatch.undo()
+    vad.vad(radar_files[:1], z_want=z_want[:5], engine='native',
+            cache=cache)
+    assert_equal(len(os.listdir(cache.directory)), 5)
+
+
+def test_result_cache_eviction(radar_files, tmp_path):
+    # Test the least recently used entries are evicted past max_bytes
+    cache = ResultCache(str(tmp_path / 'cache'))
+    vad.vad(radar_files, z_want=np.linspace(0, 2000, 21), engine='native',
+            cache=cache)
+    sizes = [os.path.getsize(os.path.join(cache.directory, name))
+             for name in os.listdir(cache.directory)]
+
+    cache.max_bytes = sum(sizes[:2])
+    cache.evict()
+    assert_equal(len(os.listdir(cache.directory)), 2)
+
+
+def test_result_cache_size_tracking(radar_files, tmp_path, monkeypatch):
+    # Test puts only scan the cache once its tracked size passes the limit
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=10 ** 9)
+    scans = []
+    entries = cache._entries
+
+    def counted_entries():
+        scans.append(1)
+        return entries()
+    monkeypatch.setattr(cache, '_entries', counted_entries)
+    vad.vad(radar_files, z_want=np.linspace(0, 2000, 21), engine='native',
+            cache=cache)
+    assert_equal(len(scans), 1)
+    assert_equal(cache._size, cache._scan_size())
+
+    cache.max_bytes = cache._size // 2
+    vad.vad(radar_files, z_want=np.linspace(0, 2000, 11), engine='native',
+            cache=cache)
+    assert cache._scan_size() <= cache.max_bytes
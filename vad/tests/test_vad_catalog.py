@@ -0,0 +1,59 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_catalog module. """
+
+import datetime
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pytest
+
+import vad
+from vad.testing import make_volume
+from vad.vad_catalog import Catalog
+
+
+@pytest.fixture
+def daily_outputs(tmp_path):
+    """ VAD files of two days, two volumes each, recorded in a catalog. """
+    database = str(tmp_path / 'catalog.sqlite')
+    z_want = np.linspace(0, 2000, 21)
+    for day in [5, 6]:
+        files = []
+        for minute in [0, 30]:
+            time = datetime.datetime(2017, 10, day, 12, minute)
+            files.append(make_volume(str(tmp_path / (
+                'sgpxsaprcmacsurI5.c1.' + time.strftime('%Y%m%d.%H%M%S')
+                + '.nc')), time))
+        vad.vad(files, z_want=z_want, engine='native').write(
+            'xsaprvadI5', str(tmp_path), catalog=database)
+    return Catalog(database)
+
+
+def test_catalog_query(daily_outputs):
+    # Test only files overlapping the window are returned, in time order
+    records = daily_outputs.query('xsaprvadI5', '2017-10-05T12:10',
+                                  '2017-10-06T12:00')
+    assert_equal([record['start'] for record in records],
+                 ['2017-10-05T12:00:00', '2017-10-06T12:00:00'])
+    assert_equal(records[0]['ntime'], 2)
+    assert_allclose(records[0]['heights'], np.linspace(0, 2000, 21))
+    assert 'u_wind' in records[0]['variables']
+
+    assert_equal(len(daily_outputs.query('xsaprvadI5', '2017-10-05T13:00',
+                                         '2017-10-06T11:00')), 0)
+    assert_equal(len(daily_outputs.query('xsaprvadI4', '2017-10-05',
+                                         '2017-10-07')), 0)
+
+
+def test_catalog_open(daily_outputs):
+    # Test a window across days is opened as one lazy dataset
+    pytest.importorskip('dask')
+    ds = daily_outputs.open('xsaprvadI5', '2017-10-05T12:10',
+                            '2017-10-06T12:00')
+    assert_equal(ds.time.values,
+                 np.array(['2017-10-05T12:30', '2017-10-06T12:00'],
+                          dtype='datetime64[ns]'))
+    assert_allclose(ds.u_wind.values[:, 5:15], 5.0, atol=0.5)
+    ds.close()
+
+    with pytest.raises(ValueError):
+        daily_outputs.open('xsaprvadI5', '2017-10-07', '2017-10-08')
@@ -0,0 +1,84 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_consensus module. """
+
+import datetime
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pytest
+import xarray
+
+import vad
+from vad.vad_consensus import consensus, window_bounds
+
+
+def _times(minutes):
+    return (np.datetime64('2017-10-05T00:00')
+            + np.array(minutes, dtype='timedelta64[m]')).astype(
+                'datetime64[ns]')
+
+
+def test_window_bounds():
+    # Test volume and time windows stop at gaps longer than max_gap
+    times = _times([0, 5, 10, 15, 60, 65])
+    start, stop = window_bounds(times, nvolumes=3)
+    assert_equal(start, [0, 0, 1, 2, 3, 4])
+    assert_equal(stop, [2, 3, 4, 5, 6, 6])
+
+    start, stop = window_bounds(times, window=datetime.timedelta(minutes=10),
+                                max_gap=datetime.timedelta(minutes=10))
+    assert_equal(start, [0, 0, 1, 2, 4, 4])
+    assert_equal(stop, [2, 3, 4, 4, 6, 6])
+
+    with pytest.raises(ValueError):
+        window_bounds(times)
+
+
+def test_consensus():
+    # Test masked values are ignored and outliers rejected by the median
+    times = _times([0, 5, 10, 15, 20])
+    u_wind = np.ma.masked_array(np.full((5, 2), 5.0))
+    u_wind[2, 0] = 50.0
+    u_wind[3, 1] = np.ma.masked
+    v_wind = np.ma.masked_array(np.full((5, 2), -10.0))
+
+    profiles = consensus(times, u_wind, v_wind, nvolumes=3)
+    assert_allclose(profiles['u_wind'], 5.0)
+    assert_equal(profiles['count'][:, 1], [2, 3, 2, 2, 1])
+    assert_allclose(profiles['direction'],
+                    360 + np.rad2deg(np.arctan2(-5, 10)), rtol=1e-6)
+
+    robust = consensus(times, u_wind, v_wind, nvolumes=5,
+                       method='robust_mean')
+    assert_allclose(robust['u_wind'], 5.0)
+    assert_equal(consensus(times, u_wind, v_wind, nvolumes=5,
+                           method='mean')['u_wind'][2, 0], 14.0)
+
+    sparse = consensus(times, u_wind, v_wind, nvolumes=3, min_count=2)
+    assert_equal(np.ma.getmaskarray(sparse['u_wind'])[:, 1],
+                 [False, False, False, False, True])
+
+
+def test_vad_consensus_write(radar_files, tmp_path):
+    # Test the consensus winds are written next to the profiles
+    test_vad = vad.vad(radar_files, z_want=np.linspace(0, 2000, 21),
+                       engine='native')
+    test_vad.consensus(window=datetime.timedelta(minutes=10))
+    path = test_vad.write('xsaprvadI5', str(tmp_path), encoding='int16')
+    with xarray.open_dataset(path) as ds:
+        assert_allclose(ds.u_wind_consensus.values, ds.u_wind.values,
+                        atol=0.02)
+        assert_equal(ds.consensus_count.values[:, 10], [2, 3, 3, 2])
+        assert_equal(ds.u_wind_consensus.encoding['dtype'], np.int16)
+        assert 'median' in ds.u_wind_consensus.attrs['comment']
+
+
+def test_vad_consensus_write_qc(radar_files, tmp_path):
+    # Test only the winds get a consensus when the QC fields are written
+    test_vad = vad.vad(radar_files, z_want=np.linspace(0, 2000, 21),
+                       engine='native', qc=True)
+    test_vad.consensus(window=datetime.timedelta(minutes=10))
+    path = test_vad.write('xsaprvadI5', str(tmp_path))
+    with xarray.open_dataset(path) as ds:
+        assert 'u_wind_consensus' in ds
+        assert 'fit_rms' in ds
+        assert 'fit_rms_consensus' not in ds
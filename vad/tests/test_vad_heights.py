@@ -0,0 +1,68 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_heights module. """
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pyart
+import pytest
+
+import vad
+from vad.vad_heights import adaptive_heights, scan_top, trim_heights
+from vad.vad_index import read_header
+from vad.vad_retrieve import _sweep_heights
+
+
+def test_adaptive_heights():
+    # Test the spacing grows from the surface up to max_spacing
+    heights = adaptive_heights()
+    spacing = np.diff(heights)
+    assert_allclose(heights[:3], [0, 50, 105])
+    assert_equal((np.diff(spacing) >= -1e-9).all(), True)
+    assert_allclose(spacing.max(), 500.0)
+    assert heights[-1] <= 10000.0
+    assert len(heights) < 40
+
+    uniform = adaptive_heights({'surface_spacing': 100.0, 'growth': 1.0,
+                                'top': 1000.0})
+    assert_allclose(uniform, np.arange(0, 1001, 100.0))
+
+    with pytest.raises(ValueError):
+        adaptive_heights({'spacing': 10.0})
+    with pytest.raises(ValueError):
+        adaptive_heights({'growth': 0.5})
+
+
+def test_trim_heights(radar_files):
+    # Test the grid keeps the height bin holding the highest gate
+    record = read_header(radar_files[0])
+    gate_heights = _sweep_heights(pyart.io.read(radar_files[0]))
+    assert_allclose(record['sweep_tops'], gate_heights.max(axis=1),
+                    rtol=1e-6)
+    top = scan_top(record['sweep_tops'])
+    assert_allclose(scan_top(record['sweep_tops'], sweeps=[0, 1]),
+                    gate_heights[1].max(), rtol=1e-6)
+    assert np.isnan(scan_top([np.nan]))
+
+    heights = np.arange(0, 10001, 500.0)
+    trimmed = trim_heights(heights, [top, np.nan])
+    assert trimmed[-1] - 250.0 < top <= trimmed[-1] + 250.0
+    assert_equal(trim_heights(heights, np.nan), heights)
+
+
+def test_vad_adaptive_trimmed(radar_files):
+    # Test the adaptive grid is trimmed to the scans and keeps the winds
+    tops = read_header(radar_files[0])['sweep_tops']
+    test_vad = vad.vad(radar_files, z_want='adaptive', trim=True,
+                       engine='native')
+    assert_equal(test_vad.hght, trim_heights(adaptive_heights(),
+                                             scan_top(tops)))
+    assert_allclose(test_vad.hght[:2], [0, 50])
+    assert_allclose(test_vad.uwind, 5.0, atol=1e-3)
+    assert_equal(test_vad.uwind.mask.any(), False)
+    assert_equal(test_vad.timing.report()['stages']['index']['count'], 1)
+
+    # Only the used sweeps set the top
+    low = vad.vad(radar_files[:1], z_want='adaptive', trim=True,
+                  engine='native', sweeps=[0], index=True)
+    assert_equal(low.hght, trim_heights(adaptive_heights(),
+                                        scan_top(tops, [0])))
+    assert len(low.hght) < len(test_vad.hght)
@@ -0,0 +1,59 @@
+""" Unit Tests for the lazy imports of the SAPR-VAD-VAP vad package. """
+
+import json
+import os
+import subprocess
+import sys
+
+from numpy.testing import assert_equal
+
+import vad
+
+# Seconds a bare import vad may take, well above the lazy import's cost
+# and well below the seconds pyart and matplotlib take.
+IMPORT_BUDGET = 0.25
+
+
+def _fresh_import(statement):
+    """
+    Runs statement after import vad in a new interpreter and returns the
+    import time in seconds and which heavy modules were loaded.
+    """
+    code = ('import json, sys, time\n'
+            'start = time.time()\n'
+            'import vad\n'
+            'seconds = time.time() - start\n'
+            + statement + '\n'
+            'print(json.dumps([seconds, dict((name, name in sys.modules) '
+            'for name in ["pyart", "matplotlib", "xarray", '
+            '"vad.vad_quicklooks"])]))\n')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(vad.__file__))]
+        + [path for path in [env.get('PYTHONPATH')] if path])
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def test_import_budget():
+    # Test import vad loads none of the heavy dependencies
+    seconds, loaded = _fresh_import('')
+    assert seconds < IMPORT_BUDGET, seconds
+    assert_equal(loaded, {'pyart': False, 'matplotlib': False,
+                          'xarray': False, 'vad.vad_quicklooks': False})
+
+
+def test_lazy_attributes():
+    # Test plotting never imports pyart, and metadata imports neither
+    _, loaded = _fresh_import("vad.get_metadata('xsaprvadI5')")
+    assert_equal(loaded['pyart'] or loaded['matplotlib'], False)
+
+    _, loaded = _fresh_import("vad.get_plot_values('xsaprvadI5')['norm']")
+    assert_equal([loaded['pyart'], loaded['matplotlib']], [False, True])
+
+    _, loaded = _fresh_import('vad.quicklooks')
+    assert_equal(loaded['pyart'], False)
+
+    _, loaded = _fresh_import('vad.vad')
+    assert_equal(loaded['vad.vad_quicklooks'], False)
+    assert 'quicklooks' in dir(vad)
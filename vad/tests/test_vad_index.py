@@ -0,0 +1,58 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_index module. """
+
+import datetime
+
+import netCDF4
+import numpy as np
+from numpy.testing import assert_equal
+
+import vad
+from vad.testing import make_volume
+from vad.vad_index import index_files, read_header, select_files
+
+
+def _make_rhi(filename, time):
+    """ A synthetic volume relabelled as RHI sweeps. """
+    make_volume(filename, time)
+    with netCDF4.Dataset(filename, 'a') as dataset:
+        variable = dataset.variables['sweep_mode']
+        variable.set_auto_chartostring(False)
+        variable[:] = np.array([list('rhi'.ljust(variable.shape[1]))]
+                               * variable.shape[0], dtype='S1')
+    return filename
+
+
+def test_read_header(radar_files, tmp_path):
+    # Test PPIs are usable and RHIs, bad files and fields are not
+    record = read_header(radar_files[1])
+    assert_equal(record['usable'], True)
+    assert_equal(record['scan_type'], 'ppi')
+    assert_equal(record['nsweeps'], 3)
+    assert_equal(record['time'], np.datetime64('2017-10-05T00:05:00'))
+
+    rhi = _make_rhi(str(tmp_path / 'rhi.nc'),
+                    datetime.datetime(2017, 10, 5, 0, 2))
+    assert_equal(read_header(rhi)['reason'], 'rhi')
+    assert_equal(read_header(radar_files[0], 'velocity')['reason'],
+                 'no velocity')
+
+    broken = tmp_path / 'broken.nc'
+    broken.write_bytes(b'not a netcdf file')
+    assert_equal(read_header(str(broken))['reason'], 'unreadable')
+
+
+def test_select_files(radar_files, tmp_path):
+    # Test unusable and already processed volumes are skipped
+    rhi = _make_rhi(str(tmp_path / 'rhi.nc'),
+                    datetime.datetime(2017, 10, 5, 0, 2))
+    files = radar_files[:2] + [rhi] + radar_files[2:]
+    processed = np.array(['2017-10-05T00:00:00'], dtype='datetime64[ns]')
+    assert_equal(select_files(files, exclude_times=processed),
+                 radar_files[1:])
+    assert_equal([record['reason'] for record in
+                  index_files(files, exclude_times=processed)],
+                 ['processed', None, 'rhi', None, None])
+
+    day = vad.vad(files, z_want=np.linspace(0, 2000, 21), engine='native',
+                  index=True)
+    assert_equal(len(day.t), 4)
@@ -0,0 +1,41 @@
+""" Unit Tests for SAPR-VAD-VAP vad.quicklooks_batch. """
+
+import datetime
+import os
+
+import numpy as np
+from numpy.testing import assert_equal
+import matplotlib.image
+
+import vad
+from vad.testing import make_volumes
+from vad.vad_batch import daily_files
+
+
+def test_quicklooks_batch(radar_files, tmp_path):
+    # Test the shared template redraws each day as a fresh quicklook would
+    (tmp_path / 'previous').mkdir()
+    previous = make_volumes(str(tmp_path / 'previous'), 4,
+                            start=datetime.datetime(2017, 10, 4))
+    for day_files in [previous, radar_files]:
+        vad.vad(day_files, z_want=np.linspace(0, 2000, 21),
+                engine='native').write(config='xsaprvadI5',
+                                       file_directory=str(tmp_path))
+    files = daily_files('xsaprvadI5', '20171001', '20171010', str(tmp_path))
+    assert_equal(len(files), 2)
+
+    single = tmp_path / 'single'
+    batch = tmp_path / 'batch'
+    single.mkdir()
+    batch.mkdir()
+    expected = vad.quicklooks(files[1], 'xsaprvadI5', str(single))
+    paths = vad.quicklooks_batch(files, 'xsaprvadI5', str(batch))
+    assert_equal([os.path.basename(path) for path in paths],
+                 ['sgpxsaprvadI5.c1.20171004.000000.png',
+                  'sgpxsaprvadI5.c1.20171005.000000.png'])
+    assert_equal(matplotlib.image.imread(paths[1]),
+                 matplotlib.image.imread(expected))
+
+    paths = vad.quicklooks_batch(files, 'xsaprvadI5', str(batch),
+                                 n_workers=2)
+    assert_equal(len(paths), 2)
@@ -0,0 +1,38 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_reader module. """
+
+import numpy as np
+from numpy.testing import assert_equal
+import pytest
+import xarray
+
+import vad
+
+
+def test_open_vad_decimation():
+    # Test the decimated selection matches striding the full arrays
+    with xarray.open_dataset('./vad/tests/example_vad.nc') as full:
+        expected = full.u_wind.values[::6, ::5]
+        times = full.time.values
+
+    with vad.open_vad('./vad/tests/example_vad.nc', time_step=6,
+                      height_step=5) as ds:
+        assert_equal(ds.u_wind.values, expected)
+
+    window = (times[10], times[19])
+    with vad.open_vad('./vad/tests/example_vad.nc',
+                      time_window=window) as ds:
+        assert_equal(ds.time.values, times[10:20])
+
+    # Even spacing selects the same heights on the uniform grid
+    with vad.open_vad('./vad/tests/example_vad.nc', time_step=6,
+                      height_spacing=500.0) as ds:
+        assert_equal(ds.u_wind.values, expected)
+
+
+def test_open_vad_chunks():
+    # Test dask chunked reads stay lazy until computed
+    pytest.importorskip('dask')
+    with vad.open_vad('./vad/tests/example_vad.nc', time_step=6,
+                      chunks={'time': 50}) as ds:
+        assert ds.u_wind.chunks is not None
+        assert_equal(np.isfinite(ds.u_wind.values).any(), True)
@@ -0,0 +1,98 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_retrieve module. """
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pyart
+
+import vad
+from vad.vad_retrieve import velocity_azimuth_display
+
+
+def test_native_vad_matches_pyart(radar_files):
+    # Test the vectorized VAD against the Py-ART retrieval
+    radar = pyart.io.read(radar_files[0])
+    z_want = np.linspace(0, 2000, 21)
+    native = velocity_azimuth_display(radar, 'corrected_velocity', z_want)
+    reference = pyart.retrieve.velocity_azimuth_display(
+        radar, 'corrected_velocity', z_want)
+
+    valid = ~np.ma.getmaskarray(native.u_wind) & np.isfinite(
+        reference.u_wind)
+    assert valid.sum() > 10
+    assert_allclose(native.u_wind[valid], reference.u_wind[valid], atol=0.1)
+    assert_allclose(native.v_wind[valid], reference.v_wind[valid], atol=0.1)
+    assert_allclose(native.u_wind[valid], 5.0, atol=1e-4)
+    assert_allclose(native.v_wind[valid], 10.0, atol=1e-4)
+
+
+def test_native_vad_gatefilter(radar_files):
+    # Test excluded gates are ignored and empty heights are masked
+    radar = pyart.io.read(radar_files[0])
+    gatefilter = pyart.filters.GateFilter(radar)
+    ray, gate = np.meshgrid(np.arange(radar.nrays), radar.range['data'],
+                            indexing='ij')
+    gatefilter.exclude_gates((gate > 2000.0) | (ray % 3 == 0))
+    z_want = np.linspace(0, 2000, 21)
+    profile = velocity_azimuth_display(
+        radar, 'corrected_velocity', z_want, gatefilter=gatefilter)
+
+    assert_equal(np.ma.getmaskarray(profile.u_wind)[-1], True)
+    assert_allclose(profile.u_wind.compressed(), 5.0, atol=1e-4)
+
+
+def test_vad_profile_native_engine(radar_files):
+    # Test the native engine is selectable from vad.vad
+    z_want = np.linspace(0, 2000, 21)
+    test_vad = vad.vad(radar_files, z_want=z_want, engine='native')
+
+    assert_equal(test_vad.uwind.shape, (4, 21))
+    assert_allclose(test_vad.vwind.compressed(), 10.0, atol=1e-4)
+
+
+def test_native_vad_geometry_cache(radar_files):
+    # Test volumes with the same scan strategy share their geometry
+    from vad import vad_retrieve
+    vad_retrieve._GEOMETRY_CACHE.clear()
+    z_want = np.linspace(0, 2000, 21)
+    profiles = [velocity_azimuth_display(pyart.io.read(file),
+                                         'corrected_velocity', z_want)
+                for file in radar_files]
+
+    assert_equal(len(vad_retrieve._GEOMETRY_CACHE), 1)
+    assert_allclose(profiles[-1].u_wind, profiles[0].u_wind)
+
+    velocity_azimuth_display(pyart.io.read(radar_files[0]),
+                             'corrected_velocity', z_want[:10])
+    assert_equal(len(vad_retrieve._GEOMETRY_CACHE), 2)
+
+
+def test_native_vad_qc(radar_files):
+    # Test the QC statistics and that failing heights are flagged
+    from vad.vad_retrieve import velocity_azimuth_display_qc
+    radar = pyart.io.read(radar_files[0])
+    z_want = np.linspace(0, 2000, 21)
+    profile, qc = velocity_azimuth_display_qc(
+        radar, 'corrected_velocity', z_want)
+    covered = qc['valid_gates'] > 0
+    assert_equal(qc['qc_flag'][covered], 0)
+    assert_equal(qc['qc_flag'][~covered], 3)
+    assert_allclose(qc['fit_rms'][covered], 0.0, atol=1e-4)
+    assert_allclose(qc['azimuth_gap'][covered], 5.0)
+    assert_equal(np.ma.getmaskarray(profile.u_wind), ~covered)
+
+    # A 150 degree sector without data and noisy gates fail their tests.
+    gatefilter = pyart.filters.GateFilter(radar)
+    azimuth = radar.azimuth['data'][:, np.newaxis] * np.ones(radar.ngates)
+    gatefilter.exclude_gates((azimuth > 10) & (azimuth < 160))
+    _, qc = velocity_azimuth_display_qc(
+        radar, 'corrected_velocity', z_want, gatefilter=gatefilter)
+    assert_allclose(qc['azimuth_gap'][covered], 150.0)
+    assert_equal(qc['qc_flag'][covered] & 8, 8)
+
+    noise = np.random.RandomState(0).normal(0, 4, radar.fields[
+        'corrected_velocity']['data'].shape)
+    radar.fields['corrected_velocity']['data'] += noise
+    _, qc = velocity_azimuth_display_qc(
+        radar, 'corrected_velocity', z_want, thresholds={'max_rms': 3.0})
+    assert_allclose(qc['fit_rms'][covered], 4.0, atol=0.5)
+    assert_equal(qc['qc_flag'][covered], 4)
@@ -0,0 +1,74 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_scratch module. """
+
+import datetime
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pytest
+import xarray
+
+from vad.testing import make_volumes
+from vad.vad_scratch import retrieve_to_scratch
+
+
+def test_retrieve_to_scratch(tmp_path):
+    # Test the store is resumed and written as daily files in chunks
+    files = make_volumes(str(tmp_path), 3)
+    files += make_volumes(str(tmp_path), 2,
+                          start=datetime.datetime(2017, 10, 6))
+    files = sorted(files, reverse=True)
+    scratch = str(tmp_path / 'scratch')
+    z_want = np.linspace(0, 2000, 21)
+
+    store = retrieve_to_scratch(files, scratch, z_want=z_want,
+                                engine='native')
+    assert_equal(store.filled, True)
+    assert_equal(store.profiles.shape, (5, 21, 4))
+    assert isinstance(store.profiles, np.memmap)
+
+    # Filled slots are skipped when resuming, empty ones retrieved
+    store.profiles[0] = -1.0
+    store.times[1] = np.datetime64('NaT')
+    store.profiles.flush()
+    store.times.flush()
+    store = retrieve_to_scratch(files, scratch, z_want=z_want,
+                                engine='native')
+    assert_equal(store.profiles[0], -1.0)
+    assert_equal(store.filled, True)
+    store.profiles[0] = store.profiles[1]
+    with pytest.raises(ValueError):
+        retrieve_to_scratch(files[:2], scratch, z_want=z_want,
+                            engine='native')
+    # Other files of the same number are not mixed into the slots
+    with pytest.raises(ValueError):
+        retrieve_to_scratch(files[1:] + files[:1], scratch, z_want=z_want,
+                            engine='native')
+
+    output = tmp_path / 'output'
+    output.mkdir()
+    paths = store.write_netcdf('xsaprvadI5', str(output), chunk_size=2)
+    assert_equal([os.path.basename(path) for path in paths],
+                 ['sgpxsaprvadI5.c1.20171005.000000.nc',
+                  'sgpxsaprvadI5.c1.20171006.000000.nc'])
+    with xarray.open_dataset(paths[0]) as ds:
+        assert_equal(len(ds.time), 3)
+        assert (np.diff(ds.time.values) > np.timedelta64(0)).all()
+        assert_allclose(np.nanmean(ds.u_wind.values), 5.0, atol=1e-3)
+        assert_allclose(ds.alt.values, store.locations[0, 0])
+
+
+def test_scratch_write_zarr(tmp_path):
+    # Test the quality control fields are stored and written to Zarr
+    files = make_volumes(str(tmp_path), 3)
+    store = retrieve_to_scratch(files, str(tmp_path / 'scratch'),
+                                z_want=np.linspace(0, 2000, 21),
+                                engine='native', qc={'min_gates': 10})
+    assert_equal(store.fields[-1], 'qc_flag')
+    assert_equal(store.qc['min_gates'], 10)
+
+    path = store.write_zarr('xsaprvadI5', str(tmp_path / 'vad.zarr'),
+                            chunk_size=2)
+    with xarray.open_zarr(path) as ds:
+        assert_equal(len(ds.time), 3)
+        assert_equal(ds.qc_flag.values[:, 10], 0)
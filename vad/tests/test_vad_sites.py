@@ -0,0 +1,55 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_sites module. """
+
+import datetime
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pytest
+import xarray
+
+from vad.testing import make_volumes
+from vad.vad_sites import main, process_sites
+
+
+def test_process_sites(tmp_path):
+    # Test two radars share a pool and are written to their own files
+    inputs = {}
+    for site, u_wind in [('I4', 6.0), ('I5', 5.0)]:
+        directory = tmp_path / site
+        directory.mkdir()
+        make_volumes(str(directory), 3, u_wind=u_wind,
+                     input_datastream='sgpxsaprcmacsur' + site + '.c1')
+        make_volumes(str(directory), 1, u_wind=u_wind,
+                     start=datetime.datetime(2017, 10, 6),
+                     input_datastream='sgpxsaprcmacsur' + site + '.c1')
+        inputs['xsaprvad' + site] = str(directory / '*.nc')
+
+    output = tmp_path / 'output'
+    output.mkdir()
+    paths, comparison = process_sites(
+        inputs, file_directory=str(output), n_workers=2,
+        z_want=np.linspace(0, 2000, 21), engine='native')
+
+    assert_equal([os.path.basename(path) for path in paths['xsaprvadI4']],
+                 ['sgpxsaprvadI4.c1.20171005.000000.nc',
+                  'sgpxsaprvadI4.c1.20171006.000000.nc'])
+    with xarray.open_dataset(paths['xsaprvadI4'][0]) as ds:
+        assert_equal(len(ds.time), 3)
+        assert_equal(ds.attrs['facility_id'], 'I4 : Billings, OK')
+        assert_allclose(np.nanmean(ds.u_wind.values), 6.0, atol=1e-3)
+    with xarray.open_dataset(paths['xsaprvadI5'][1]) as ds:
+        assert_equal(ds.attrs['facility_id'], 'I5 : Garber, OK')
+
+    assert_equal(list(comparison.pair.values), ['xsaprvadI4-xsaprvadI5'])
+    assert_equal(comparison['count'].values[0, 10], 4)
+    assert_allclose(comparison.u_bias.values[0, 10], 1.0, atol=1e-3)
+    assert_allclose(comparison.rms_difference.values[0, 10], 1.0,
+                    atol=1e-3)
+    assert_allclose(comparison.v_bias.values[0, 10], 0.0, atol=1e-3)
+
+
+def test_main_site_arguments():
+    # Test sites given on the command line must be CONFIG=GLOB
+    with pytest.raises(SystemExit):
+        main(['xsaprvadI5'])
@@ -0,0 +1,52 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_timing module. """
+
+import json
+import os
+
+import numpy as np
+from numpy.testing import assert_equal
+
+import vad
+from vad.vad_profile import _loaded_bytes, read_radar
+from vad.vad_timing import StageTimer
+
+
+def test_vad_timing(radar_files, tmp_path):
+    # Test the stages and files of a vad and its quicklook are recorded
+    day = vad.vad(radar_files, z_want=np.linspace(0, 2000, 21),
+                  engine='native')
+    path = day.write('xsaprvadI5', str(tmp_path))
+    vad.quicklooks(path, 'xsaprvadI5', str(tmp_path), timer=day.timing)
+
+    report = day.timing.report()
+    for name in ['read', 'retrieve']:
+        assert_equal(report['stages'][name]['count'], 4)
+    assert_equal(report['stages']['read']['bytes'],
+                 sum(_loaded_bytes(read_radar(file, 'corrected_velocity'),
+                                   'corrected_velocity')
+                     for file in radar_files))
+    assert_equal(report['stages']['create_vad']['count'], 1)
+    assert_equal(report['stages']['write']['bytes'], os.path.getsize(path))
+    assert_equal(report['stages']['quicklook_save']['count'], 1)
+    assert_equal([record['file'] for record in report['files']],
+                 radar_files + [path])
+    assert report['peak_memory'] > 0
+
+    assert_equal(json.loads(day.timing.to_json())['stages']['read']['count'],
+                 4)
+
+
+def test_write_prometheus(tmp_path):
+    # Test totals are written in the Prometheus text format
+    timer = StageTimer()
+    with timer.stage('write', nbytes=100):
+        pass
+    timer.add('read', 2.0, 300, count=3)
+    path = str(tmp_path / 'vad.prom')
+    timer.write_prometheus(path, labels={'site': 'I5'})
+    with open(path) as prom_file:
+        lines = prom_file.read().splitlines()
+    assert 'vad_stage_bytes_total{site="I5",stage="read"} 300.0' in lines
+    assert 'vad_stage_calls_total{site="I5",stage="write"} 1.0' in lines
+    assert '# TYPE vad_stage_seconds_total counter' in lines
+    assert_equal(timer.report()['stages']['read']['throughput'], 150.0)
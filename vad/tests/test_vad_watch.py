@@ -0,0 +1,77 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_watch module. """
+
+import datetime
+import os
+
+import netCDF4
+import numpy as np
+from numpy.testing import assert_equal
+import xarray
+
+from vad.testing import make_volume
+from vad.vad_watch import DirectoryWatcher
+
+
+def test_directory_watcher(tmp_path):
+    # Test files dropped into a watched directory are appended per day
+    incoming = tmp_path / 'incoming'
+    output = tmp_path / 'output'
+    images = tmp_path / 'images'
+    for folder in [incoming, output, images]:
+        folder.mkdir()
+
+    def drop(minutes):
+        time = datetime.datetime(2017, 10, 5) + datetime.timedelta(
+            minutes=minutes)
+        make_volume(str(incoming / ('sgpxsaprcmacsurI5.c1.'
+                                    + time.strftime('%Y%m%d.%H%M%S')
+                                    + '.nc')), time)
+
+    watcher = DirectoryWatcher(
+        str(incoming), 'xsaprvadI5', file_directory=str(output),
+        image_directory=str(images), settle=0.0,
+        z_want=np.linspace(0, 2000, 21), engine='native')
+    drop(0)
+    drop(5)
+    watcher.run(max_cycles=1)
+    path = str(output / 'sgpxsaprvadI5.c1.20171005.000000.nc')
+    assert_equal(os.path.exists(path), True)
+    assert_equal(os.path.exists(
+        str(images / 'sgpxsaprvadI5.c1.20171005.000000.png')), True)
+
+    drop(10)
+    assert_equal(len(watcher.poll()), 1)
+    watcher.run(max_cycles=1)
+    assert_equal(watcher.poll(), [])
+    with xarray.open_dataset(path) as ds:
+        assert_equal(len(ds.time), 3)
+
+
+def test_directory_watcher_bad_file(tmp_path):
+    # Test a volume failing to read is quarantined and the rest processed
+    incoming = tmp_path / 'incoming'
+    output = tmp_path / 'output'
+    quarantine = tmp_path / 'quarantine'
+    for folder in [incoming, output]:
+        folder.mkdir()
+    for minutes in [0, 5]:
+        time = datetime.datetime(2017, 10, 5) + datetime.timedelta(
+            minutes=minutes)
+        make_volume(str(incoming / ('sgpxsaprcmacsurI5.c1.'
+                                    + time.strftime('%Y%m%d.%H%M%S')
+                                    + '.nc')), time)
+    bad = str(incoming / 'sgpxsaprcmacsurI5.c1.20171005.000500.nc')
+    # The header still reads but the full read of the volume fails.
+    with netCDF4.Dataset(bad, 'a') as dataset:
+        dataset.renameVariable('azimuth', 'bad_azimuth')
+
+    watcher = DirectoryWatcher(
+        str(incoming), 'xsaprvadI5', file_directory=str(output),
+        settle=0.0, quarantine_directory=str(quarantine),
+        z_want=np.linspace(0, 2000, 21), engine='native')
+    watcher.run(interval=0.0, max_cycles=2)
+    assert_equal(os.listdir(str(quarantine)), [os.path.basename(bad)])
+    assert_equal(watcher.poll(), [])
+    with xarray.open_dataset(
+            str(output / 'sgpxsaprvadI5.c1.20171005.000000.nc')) as ds:
+        assert_equal(len(ds.time), 1)
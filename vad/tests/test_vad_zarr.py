@@ -0,0 +1,69 @@
+""" Unit Tests for SAPR-VAD-VAP vad.vad_zarr module. """
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pytest
+import xarray
+
+import vad
+from vad.vad_zarr import create_zarr
+
+pytest.importorskip('zarr')
+
+
+def test_write_zarr_append(radar_files, tmp_path):
+    # Test appends only add profiles not already in the store
+    store = str(tmp_path / 'sgpxsaprvadI5.c1.zarr')
+    z_want = np.linspace(0, 2000, 21)
+    full = vad.vad(radar_files, z_want=z_want, engine='native')
+    vad.vad(radar_files[:2], z_want=z_want, engine='native').write_zarr(
+        'xsaprvadI5', store)
+    full.write_zarr('xsaprvadI5', store)
+
+    with xarray.open_zarr(store) as ds:
+        assert_equal(ds.time.values, full.t)
+        assert_allclose(ds.u_wind.values, full.uwind)
+        assert_equal(ds.attrs['datastream'], 'sgpxsaprvadI5.c1')
+
+
+def test_write_zarr_region(radar_files, tmp_path):
+    # Test workers fill disjoint slots of a pre-created store
+    store = str(tmp_path / 'sgpxsaprvadI5.c1.zarr')
+    z_want = np.linspace(0, 2000, 21)
+    full = vad.vad(radar_files, z_want=z_want, engine='native')
+    halves = [vad.vad(files, z_want=z_want, engine='native')
+              for files in [radar_files[:2], radar_files[2:]]]
+    create_zarr(halves[0], 'xsaprvadI5', full.t, store=store, chunk_times=2)
+
+    with xarray.open_zarr(store) as ds:
+        assert_equal(np.isnan(ds.u_wind.values[2:]).all(), True)
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda half: half.write_zarr('xsaprvadI5', store,
+                                                    region=True), halves))
+
+    with xarray.open_zarr(store) as ds:
+        assert_equal(ds.time.values, full.t)
+        assert_allclose(ds.v_wind.values, full.vwind)
+
+    # Profiles whose times are not consecutive slots are refused
+    sparse = str(tmp_path / 'sparse.zarr')
+    create_zarr(halves[1], 'xsaprvadI5', full.t[::2], store=sparse)
+    with pytest.raises(ValueError):
+        halves[0].write_zarr('xsaprvadI5', sparse, region=True)
+
+
+def test_write_zarr_qc(radar_files, tmp_path):
+    # Test appended stores hold no flag_counts of only the latest write
+    store = str(tmp_path / 'sgpxsaprvadI5.c1.zarr')
+    z_want = np.linspace(0, 2000, 21)
+    qc = {'min_gates': 1000}
+    vad.vad(radar_files[:2], z_want=z_want, engine='native',
+            qc=qc).write_zarr('xsaprvadI5', store)
+    full = vad.vad(radar_files, z_want=z_want, engine='native', qc=qc)
+    full.write_zarr('xsaprvadI5', store)
+
+    with xarray.open_zarr(store) as ds:
+        assert 'flag_counts' not in ds.qc_flag.attrs
+        assert_equal(ds.qc_flag.values, full._buffer['qc_flag'])
@@ -0,0 +1,237 @@
+"""
+vad.vad_batch
+=============
+Resumable multi-day, multi-radar VAD reprocessing.
+
+    datespan
+    daily_files
+    reprocess
+    main
+
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import get_metadata
+from .vad_profile import vad, _daily_path
+from .vad_quicklooks import quicklooks
+
+logger = logging.getLogger(__name__)
+
+
+def datespan(start_date, end_date, delta=datetime.timedelta(days=1)):
+    """ Retrieves all dates between the start and end date. """
+    current_date = start_date
+    while current_date < end_date:
+        yield current_date
+        current_date += delta
+
+
+def daily_files(config, start_date, end_date, file_directory=None):
+    """
+    Existing daily VAD files of a radar from start_date up to end_date
+    (exclusive), both as YYYYMMDD, in file_directory.
+    """
+    start = datetime.datetime.strptime(start_date, '%Y%m%d')
+    stop = datetime.datetime.strptime(end_date, '%Y%m%d')
+    files = []
+    for date_time in datespan(start, stop):
+        path = _daily_path(config, file_directory, date_time)
+        if os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def _input_files(input_pattern, config, date):
+    """
+    Sorted radar files of a day. input_pattern is formatted with the
+    config's input_datastream and the date as YYYYMMDD.
+    """
+    input_datastream = get_metadata(config)['input_datastream']
+    files = glob.glob(input_pattern.format(
+        input_datastream=input_datastream, date=date), recursive=True)
+    files.sort()
+    return files
+
+
+def _signature(files):
+    """ Number of files and newest modification time of a day's inputs. """
+    return {'files': len(files),
+            'mtime': max(os.path.getmtime(file) for file in files)}
+
+
+def _process_day(config, date, files, file_directory, image_directory,
+                 kwargs):
+    """ Creates the VAD file, and quicklook, of a single radar day. """
+    day = vad(files, **dict({'index': True}, **kwargs))
+    if len(day.t) == 0:
+        return None
+    path = day.write(config, file_directory)
+    if image_directory is not None:
+        quicklooks(path, config, image_directory)
+    return path
+
+
+def _load_manifest(path):
+    """ Returns the manifest at path, or an empty one. """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def _save_manifest(path, manifest):
+    """ Writes the manifest so a crash never leaves a partial file. """
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def reprocess(start_date, end_date, configs, input_pattern,
+              file_directory=None, image_directory=None, n_workers=None,
+              manifest=None, **kwargs):
+    """
+    Creates daily VAD files for every radar and day in a date range,
+    skipping days already completed by an earlier run.
+
+    Parameters
+    ----------
+    start_date, end_date : str
+        First and end (exclusive) dates as YYYYMMDD.
+    configs : list
+        Radar names found in config.py, e.g. ['xsaprvadI4', 'xsaprvadI5'].
+    input_pattern : str
+        Glob pattern of a day's radar files, formatted with the radar's
+        input_datastream and the date, e.g.
+        '/data/{input_datastream}/{input_datastream}.{date}*'.
+
+    Other Parameters
+    ----------------
+    file_directory : str
+        Output folder of the VAD files. Defaults to the users home
+        directory.
+    image_directory : str
+        Output folder of the quicklooks. None skips the quicklooks.
+    n_workers : int
+        Number of days processed in parallel. None or 1 runs serially.
+    manifest : str
+        Path of the JSON manifest recording completed days. Defaults to
+        vad_manifest.json in file_directory. A day is redone when it is
+        missing from the manifest, its output file is gone, or its input
+        files changed since it was completed.
+    **kwargs
+        Passed on to vad.vad, e.g. vel_field, z_want or engine. Files
+        that are not PPI volumes are skipped from their headers unless
+        index=False is given.
+
+    Returns
+    -------
+    manifest : dict
+        Completed days as {config: {date: record}}. Days that fail are
+        logged and left out, so the other days still complete and are
+        recorded.
+
+    """
+    if file_directory is None:
+        file_directory = os.path.expanduser('~')
+    if manifest is None:
+        manifest = os.path.join(file_directory, 'vad_manifest.json')
+    completed = _load_manifest(manifest)
+
+    start = datetime.datetime.strptime(start_date, '%Y%m%d')
+    stop = datetime.datetime.strptime(end_date, '%Y%m%d')
+    tasks = []
+    for date_time in datespan(start, stop):
+        date = datetime.datetime.strftime(date_time, '%Y%m%d')
+        for config in configs:
+            files = _input_files(input_pattern, config, date)
+            if not files:
+                continue
+            record = completed.get(config, {}).get(date)
+            signature = _signature(files)
+            if (record is not None and os.path.exists(record['output'])
+                    and record['files'] == signature['files']
+                    and record['mtime'] >= signature['mtime']):
+                continue
+            tasks.append((config, date, files, signature))
+
+    def record_task(task, path):
+        config, date, files, signature = task
+        if path is None:
+            logger.warning('%s %s produced no profiles', config, date)
+            return
+        record = dict(signature, output=path,
+                      completed=datetime.datetime.utcnow().strftime(
+                          '%Y-%m-%dT%H:%M:%S'))
+        completed.setdefault(config, {})[date] = record
+        _save_manifest(manifest, completed)
+        logger.info('Completed %s %s', config, date)
+
+    if n_workers is not None and n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = dict(
+                (pool.submit(_process_day, task[0], task[1], task[2],
+                             file_directory, image_directory, kwargs), task)
+                for task in tasks)
+            for future in as_completed(futures):
+                try:
+                    path = future.result()
+                except Exception:
+                    _log_failure(futures[future])
+                    continue
+                record_task(futures[future], path)
+    else:
+        for task in tasks:
+            try:
+                path = _process_day(task[0], task[1], task[2],
+                                    file_directory, image_directory, kwargs)
+            except Exception:
+                _log_failure(task)
+                continue
+            record_task(task, path)
+    return completed
+
+
+def _log_failure(task):
+    """ Logs a failed day, which stays out of the manifest to be redone. """
+    logger.exception('Failed %s %s, it is redone on the next run',
+                     task[0], task[1])
+
+
+def main(argv=None):
+    """ Command line entry point, see vad_batch --help. """
+    parser = argparse.ArgumentParser(
+        description='Reprocess daily VAD files for a range of dates and '
+                    'radars, resuming from the manifest of earlier runs.')
+    parser.add_argument('start_date', help='First date, YYYYMMDD.')
+    parser.add_argument('end_date', help='End date (exclusive), YYYYMMDD.')
+    parser.add_argument('input_pattern',
+                        help='Glob pattern of a day of radar files with '
+                             '{input_datastream} and {date} fields.')
+    parser.add_argument('-c', '--config', action='append', required=True,
+                        help='Radar name found in config.py, repeatable.')
+    parser.add_argument('-o', '--file-directory', default=None,
+                        help='Output folder of the daily VAD files.')
+    parser.add_argument('-i', '--image-directory', default=None,
+                        help='Output folder of the quicklooks.')
+    parser.add_argument('-m', '--manifest', default=None,
+                        help='Path of the JSON manifest.')
+    parser.add_argument('-n', '--n-workers', type=int, default=1,
+                        help='Number of days processed in parallel.')
+    parser.add_argument('--engine', default=None,
+                        help="VAD engine, 'pyart' or 'native'.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    reprocess(args.start_date, args.end_date, args.config,
+              args.input_pattern, file_directory=args.file_directory,
+              image_directory=args.image_directory,
+              n_workers=args.n_workers, manifest=args.manifest,
+              engine=args.engine)
@@ -0,0 +1,123 @@
+"""
+vad.vad_buffer
+==============
+In place storage for VAD profiles.
+
+    ProfileBuffer
+
+"""
+
+import numpy as np
+
+
+class ProfileBuffer(object):
+    """
+    A float32 (time, height) store for VAD profiles.
+
+    Profiles are written into preallocated masked arrays which grow by
+    chunk_size rows when full, so each profile is held only once.
+
+    Parameters
+    ----------
+    nheight : int
+        Number of heights in each profile.
+    chunk_size : int, optional
+        Number of rows allocated at a time.
+    fields : tuple, optional
+        Names of the profile fields stored.
+
+    """
+
+    def __init__(self, nheight, chunk_size=288,
+                 fields=('u_wind', 'v_wind', 'speed', 'direction')):
+        self.nheight = nheight
+        self.chunk_size = chunk_size
+        self.fields = fields
+        self.size = 0
+        self._time = np.empty(chunk_size, dtype='datetime64[ns]')
+        self._data = dict(
+            (field, np.ma.masked_all((chunk_size, nheight), dtype=np.float32))
+            for field in fields)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, field):
+        """ Returns a view of the filled rows of field. """
+        return self._data[field][:self.size]
+
+    @property
+    def time(self):
+        """ Times of the filled rows as datetime64[ns]. """
+        return self._time[:self.size]
+
+    @property
+    def full(self):
+        """ True when every allocated row has been filled. """
+        return self.size == len(self._time)
+
+    def append(self, time, profiles):
+        """
+        Writes a single profile into the next free row.
+
+        Parameters
+        ----------
+        time : datetime
+            Time of the profile.
+        profiles : dict
+            Dictionary containing a height array for every field.
+            Masked and non-finite values are stored as masked.
+
+        """
+        if self.full:
+            self._grow()
+        self._time[self.size] = np.datetime64(time, 'ns')
+        for field in self.fields:
+            self._data[field][self.size] = np.ma.masked_invalid(
+                profiles[field])
+        self.size += 1
+
+    def extend(self, times, profiles):
+        """
+        Writes several profiles into the next free rows.
+
+        Parameters
+        ----------
+        times : array
+            Times of the profiles as datetime64.
+        profiles : dict
+            Dictionary containing a (time, height) array for every field.
+            Masked and non-finite values are stored as masked.
+
+        """
+        count = len(times)
+        while self.size + count > len(self._time):
+            self._grow()
+        rows = slice(self.size, self.size + count)
+        self._time[rows] = np.asarray(times, dtype='datetime64[ns]')
+        for field in self.fields:
+            self._data[field][rows] = np.ma.masked_invalid(profiles[field])
+        self.size += count
+
+    def sort(self):
+        """ Sorts the filled rows in place by time. """
+        order = np.argsort(self.time, kind='mergesort')
+        self._time[:self.size] = self._time[order]
+        for field in self.fields:
+            self._data[field][:self.size] = self._data[field][order]
+
+    def clear(self):
+        """ Empties the buffer, keeping the allocated rows for reuse. """
+        self.size = 0
+        for field in self.fields:
+            self._data[field].mask = True
+
+    def _grow(self):
+        """ Adds chunk_size rows to the allocated storage. """
+        self._time = np.concatenate(
+            [self._time, np.empty(self.chunk_size, dtype='datetime64[ns]')])
+        for field in self.fields:
+            self._data[field] = np.ma.concatenate(
+                [self._data[field],
+                 np.ma.masked_all((self.chunk_size, self.nheight),
+                                  dtype=np.float32)])
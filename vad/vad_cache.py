@@ -0,0 +1,154 @@
+"""
+vad.vad_cache
+=============
+On disk cache of per volume VAD results.
+
+    ResultCache
+
+"""
+
+import datetime
+import hashlib
+import os
+
+import numpy as np
+
+from .default_config import _QC_FIELDS
+
+_PROFILES = ['u_wind', 'v_wind', 'speed', 'direction']
+_LOCATION = ['altitude', 'longitude', 'latitude']
+
+# Puts between rescans of the cache size, which also counts the entries
+# written by other processes sharing the cache.
+_RESCAN_PUTS = 100
+# Eviction frees space down to this fraction of max_bytes, so it is not
+# needed again on the next few puts.
+_EVICT_TO = 0.9
+
+
+class ResultCache(object):
+    """
+    Stores the VAD profile of each radar file as a small .npz file.
+
+    Entries are keyed on the radar file path, modification time and size
+    together with the retrieval parameters, so a changed file or setting
+    is never served a stale profile. When the cache grows past max_bytes
+    the least recently used entries are removed. The size is tracked as
+    entries are put and the directory is only scanned when the limit is
+    passed, or every _RESCAN_PUTS puts, rather than on every put.
+
+    Parameters
+    ----------
+    directory : str
+        Folder holding the cache entries. Created if needed.
+    max_bytes : int, optional
+        Size limit of the cache. None never evicts entries.
+
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._puts = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, file, params):
+        """
+        Cache key of a radar file retrieved with params, a tuple of the
+        retrieval settings. Arrays in params are hashed by value.
+        """
+        stat = os.stat(file)
+        digest = hashlib.sha1()
+        digest.update(repr((os.path.abspath(file), stat.st_mtime,
+                            stat.st_size)).encode())
+        for param in params:
+            if isinstance(param, np.ndarray):
+                digest.update(np.ascontiguousarray(param).tobytes())
+            else:
+                digest.update(repr(param).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """ Returns the cached result for key, or None. """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = dict((name, np.ma.masked_invalid(entry[name]))
+                              for name in _PROFILES)
+                result.update((name, entry[name]) for name in _QC_FIELDS
+                              if name in entry.files)
+                result.update((name, entry[name]) for name in _LOCATION)
+                result['time'] = datetime.datetime.strptime(
+                    str(entry['time']), '%Y-%m-%dT%H:%M:%S.%f')
+            # Mark the entry as recently used for eviction.
+            os.utime(path, None)
+        except (IOError, OSError, KeyError, ValueError):
+            return None
+        return result
+
+    def put(self, key, result):
+        """ Stores a result dictionary from the retrieval under key. """
+        arrays = dict((name, np.ma.filled(
+            np.ma.asarray(result[name], dtype=np.float32), np.nan))
+                      for name in _PROFILES)
+        arrays.update((name, np.asarray(result[name]))
+                      for name in _LOCATION)
+        arrays.update((name, np.asarray(result[name]))
+                      for name in _QC_FIELDS if name in result)
+        arrays['time'] = np.array(
+            result['time'].strftime('%Y-%m-%dT%H:%M:%S.%f'))
+        # Write then rename so concurrent workers never read a partial file.
+        temporary = self._path(key) + '.' + str(os.getpid()) + '.tmp'
+        with open(temporary, 'wb') as entry:
+            np.savez(entry, **arrays)
+        os.replace(temporary, self._path(key))
+        if self.max_bytes is None:
+            return
+        self._puts += 1
+        if self._size is None or self._puts >= _RESCAN_PUTS:
+            self._size = self._scan_size()
+            self._puts = 0
+        else:
+            self._size += os.path.getsize(self._path(key))
+        if self._size > self.max_bytes:
+            self.evict(int(self.max_bytes * _EVICT_TO))
+
+    def _entries(self):
+        """ (modification time, size, path) of every cache entry. """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self):
+        """ Total size of the cache entries on disk. """
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes=None):
+        """
+        Removes least recently used entries until under max_bytes, which
+        defaults to that of the cache.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._size = total
@@ -0,0 +1,132 @@
+"""
+vad.vad_catalog
+===============
+Time index of VAD output files.
+
+    Catalog
+
+"""
+
+import glob
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import xarray
+
+from .config import get_metadata
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    datastream TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    ntime INTEGER NOT NULL,
+    heights TEXT NOT NULL,
+    variables TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS files_time ON files (datastream, start, end);
+"""
+
+
+def _iso(time):
+    """ ISO 8601 string of a time, which sorts in time order. """
+    return pd.Timestamp(time).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class Catalog(object):
+    """
+    SQLite index of VAD NetCDF files recording the datastream, time range,
+    height grid and variables of each file, so a time window can be found
+    without opening every file.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database. Created if needed.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+            connection.commit()
+
+    def _connect(self):
+        """
+        A new connection to the database. Use it with
+        contextlib.closing, as sqlite3's own context manager only ends the
+        transaction and leaves the connection open.
+        """
+        return sqlite3.connect(self.path)
+
+    def add(self, file):
+        """ Adds or updates the record of a VAD NetCDF file. """
+        with xarray.open_dataset(file) as ds:
+            times = ds.time.values
+            record = (os.path.abspath(file), ds.attrs['datastream'],
+                      _iso(times.min()), _iso(times.max()), len(times),
+                      json.dumps(ds.height.values.tolist()),
+                      json.dumps(sorted(ds.data_vars)))
+        with closing(self._connect()) as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                record)
+            connection.commit()
+
+    def scan(self, directory, pattern='*.nc'):
+        """ Adds every VAD file matching pattern in directory. """
+        for file in sorted(glob.glob(os.path.join(directory, pattern))):
+            self.add(file)
+
+    def query(self, config, start, end):
+        """
+        Records of the files of a radar holding profiles between start
+        and end, inclusive, in time order.
+
+        Parameters
+        ----------
+        config : str
+            A string of the radar name found from config.py.
+        start, end : datetime, str or datetime64
+            Time window.
+
+        Returns
+        -------
+        records : list
+            Dictionaries with the path, datastream, start, end, ntime,
+            heights and variables of each file.
+
+        """
+        datastream = get_metadata(config)['datastream']
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT * FROM files WHERE datastream = ? AND start <= ? '
+                'AND end >= ? ORDER BY start',
+                (datastream, _iso(end), _iso(start))).fetchall()
+        names = ['path', 'datastream', 'start', 'end', 'ntime', 'heights',
+                 'variables']
+        records = [dict(zip(names, row)) for row in rows]
+        for record in records:
+            record['heights'] = np.array(json.loads(record['heights']))
+            record['variables'] = json.loads(record['variables'])
+        return records
+
+    def open(self, config, start, end, **kwargs):
+        """
+        Lazily concatenated profiles of a radar between start and end.
+        Requires dask. kwargs are passed to xarray.open_mfdataset.
+        """
+        files = [record['path'] for record in self.query(config, start, end)]
+        if not files:
+            raise ValueError('No ' + config + ' files between '
+                             + _iso(start) + ' and ' + _iso(end) + '.')
+        ds = xarray.open_mfdataset(files, combine='nested',
+                                   concat_dim='time', data_vars='minimal',
+                                   coords='minimal', compat='override',
+                                   **kwargs)
+        return ds.sel(time=slice(pd.Timestamp(start), pd.Timestamp(end)))
@@ -0,0 +1,156 @@
+"""
+vad.vad_consensus
+=================
+Rolling consensus of VAD profiles.
+
+    window_bounds
+    consensus
+
+Each profile is replaced by the median, mean or robust mean of the
+profiles in a window around it. All windows are gathered at once into a
+(time, window, height) array, so there is no loop over times.
+
+"""
+
+import warnings
+
+import numpy as np
+
+_METHODS = ('median', 'mean', 'robust_mean')
+
+# Scale of the median absolute deviation to a normal standard deviation.
+_MAD_SCALE = 1.4826
+
+
+def window_bounds(times, nvolumes=None, window=None, max_gap=None):
+    """
+    Start and stop indices of the centered window of every time.
+
+    Parameters
+    ----------
+    times : array
+        Sorted profile times as datetime64.
+    nvolumes : int, optional
+        Window of nvolumes consecutive profiles.
+    window : timedelta or timedelta64, optional
+        Window of every profile within window / 2 of the time. Only one
+        of nvolumes and window is given.
+    max_gap : timedelta or timedelta64, optional
+        Windows do not extend across gaps between consecutive times longer
+        than max_gap.
+
+    Returns
+    -------
+    start, stop : array
+        Indices of the first and one past the last profile of each window.
+
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    index = np.arange(len(times))
+    if (nvolumes is None) == (window is None):
+        raise ValueError('Give one of nvolumes and window.')
+    if nvolumes is not None:
+        start = index - (nvolumes - 1) // 2
+        stop = index + nvolumes // 2 + 1
+    else:
+        half = np.timedelta64(window, 'ns') / 2
+        start = np.searchsorted(times, times - half, side='left')
+        stop = np.searchsorted(times, times + half, side='right')
+
+    if max_gap is not None and len(times) > 1:
+        gap = np.diff(times) > np.timedelta64(max_gap, 'ns')
+        segment = np.concatenate([[0], np.cumsum(gap)])
+        segment_start = np.searchsorted(segment, segment, side='left')
+        segment_stop = np.searchsorted(segment, segment, side='right')
+        start = np.maximum(start, segment_start)
+        stop = np.minimum(stop, segment_stop)
+    return np.clip(start, 0, len(times)), np.clip(stop, 0, len(times))
+
+
+def _gather(data, start, stop):
+    """
+    The (time, window, height) values of every window, with NaN for masked
+    values and past the end of shorter windows.
+    """
+    data = np.ma.filled(np.ma.asarray(data, dtype=np.float64), np.nan)
+    width = max(int(np.max(stop - start)), 1) if len(start) else 1
+    index = start[:, np.newaxis] + np.arange(width)
+    inside = index < stop[:, np.newaxis]
+    index = np.minimum(index, len(data) - 1)
+    values = data[index]
+    values[~inside] = np.nan
+    return values
+
+
+def _reduce(values, method, threshold):
+    """ Consensus of every window, along axis 1. """
+    # All-NaN windows are masked by the caller, so their warnings are
+    # silenced.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if method == 'mean':
+            return np.nanmean(values, axis=1)
+        median = np.nanmedian(values, axis=1)
+        if method == 'median':
+            return median
+        deviation = np.abs(values - median[:, np.newaxis])
+        spread = _MAD_SCALE * np.nanmedian(deviation, axis=1)
+        # Values within threshold spreads of the median, or equal to it
+        # when the spread is zero, are averaged.
+        outlier = deviation > np.maximum(threshold * spread,
+                                         1e-6)[:, np.newaxis]
+        return np.nanmean(np.where(outlier, np.nan, values), axis=1)
+
+
+def consensus(times, u_wind, v_wind, nvolumes=None, window=None,
+              method='median', max_gap=None, min_count=1, threshold=3.0):
+    """
+    Rolling consensus winds of (time, height) VAD profiles. Masked values
+    are ignored, and heights with fewer than min_count values in a window
+    are masked.
+
+    Parameters
+    ----------
+    times : array
+        Sorted profile times as datetime64.
+    u_wind, v_wind : array
+        (time, height) masked wind components in m/s.
+    nvolumes, window, max_gap :
+        Windows of each profile, see window_bounds.
+    method : str, optional
+        'median', 'mean', or 'robust_mean', the mean of the values within
+        threshold scaled median absolute deviations of the median. u and v
+        are each reduced separately.
+    min_count : int, optional
+        Least number of valid values of a height in a window.
+    threshold : float, optional
+        Outlier threshold of 'robust_mean'.
+
+    Returns
+    -------
+    profiles : dict
+        (time, height) masked float32 u_wind, v_wind, speed, direction and
+        the number of valid values in each window, count.
+
+    """
+    if method not in _METHODS:
+        raise ValueError('Unknown consensus method: ' + str(method)
+                         + '. Options are ' + ', '.join(_METHODS))
+    start, stop = window_bounds(times, nvolumes, window, max_gap)
+    valid = ~(np.ma.getmaskarray(u_wind) | np.ma.getmaskarray(v_wind)
+              | ~np.isfinite(np.ma.filled(u_wind, np.nan))
+              | ~np.isfinite(np.ma.filled(v_wind, np.nan)))
+    u_values = _gather(np.ma.masked_where(~valid, u_wind), start, stop)
+    v_values = _gather(np.ma.masked_where(~valid, v_wind), start, stop)
+    count = np.sum(np.isfinite(u_values), axis=1)
+
+    mask = count < max(min_count, 1)
+    u_mean = np.ma.masked_where(mask, _reduce(u_values, method, threshold))
+    v_mean = np.ma.masked_where(mask, _reduce(v_values, method, threshold))
+    speed = np.ma.sqrt(u_mean * u_mean + v_mean * v_mean)
+    direction = np.ma.mod(np.rad2deg(np.ma.arctan2(-u_mean, -v_mean)), 360)
+    return {'u_wind': u_mean.astype(np.float32),
+            'v_wind': v_mean.astype(np.float32),
+            'speed': speed.astype(np.float32),
+            'direction': direction.astype(np.float32),
+            'count': count.astype(np.int32)}
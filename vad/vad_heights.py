@@ -0,0 +1,102 @@
+"""
+vad.vad_heights
+===============
+Height grids of VAD profiles.
+
+    adaptive_heights
+    sweep_tops
+    scan_top
+    trim_heights
+
+"""
+
+import numpy as np
+
+from .config import get_height_grid
+
+# Effective earth radius in meters of the 4/3 earth beam model, as used by
+# pyart.core.antenna_to_cartesian for the gate heights of the retrieval.
+_EFFECTIVE_RADIUS = 6371.0 * 1000.0 * 4.0 / 3.0
+
+
+def adaptive_heights(grid=None):
+    """
+    Heights finer near the surface and coarser aloft.
+
+    Parameters
+    ----------
+    grid : dict, optional
+        bottom and top, the lowest and highest allowed heights in meters,
+        surface_spacing, the spacing of the lowest levels, max_spacing,
+        the largest spacing, and growth, the ratio of each spacing to the
+        one below it. Missing keys default to those of default_config.
+
+    Returns
+    -------
+    z_want : array
+        Increasing heights in meters.
+
+    """
+    grid = get_height_grid(grid)
+    if not 0 < grid['surface_spacing'] <= grid['max_spacing']:
+        raise ValueError('The height spacings must be positive and '
+                         'surface_spacing at most max_spacing.')
+    if grid['growth'] < 1:
+        raise ValueError('The spacing growth must be at least 1.')
+
+    heights = [float(grid['bottom'])]
+    spacing = float(grid['surface_spacing'])
+    while heights[-1] + spacing <= grid['top']:
+        heights.append(heights[-1] + spacing)
+        spacing = min(spacing * grid['growth'], grid['max_spacing'])
+    return np.array(heights)
+
+
+def sweep_tops(ranges, fixed_angles):
+    """
+    Height in meters above the radar of the farthest gate of each sweep,
+    from the gate ranges in meters and the fixed angles in degrees. NaN
+    for sweeps pointing up, which give no horizontal wind.
+    """
+    ranges = np.asarray(ranges, dtype=np.float64)
+    angles = np.asarray(fixed_angles, dtype=np.float64)
+    if not len(ranges):
+        return np.full(len(angles), np.nan)
+    distance = np.nanmax(ranges)
+    with np.errstate(invalid='ignore'):
+        tops = np.sqrt(distance ** 2 + _EFFECTIVE_RADIUS ** 2
+                       + 2.0 * distance * _EFFECTIVE_RADIUS
+                       * np.sin(np.deg2rad(angles))) - _EFFECTIVE_RADIUS
+        tops[~(np.abs(angles) < 90.0)] = np.nan
+    return tops
+
+
+def scan_top(tops, sweeps=None):
+    """
+    Highest of the sweep_tops of a scan, of only the sweeps indexed by
+    sweeps if given. NaN if none is known.
+    """
+    tops = np.asarray(tops, dtype=np.float64)
+    if sweeps is not None and len(tops):
+        tops = tops[np.asarray(sweeps)]
+    tops = tops[np.isfinite(tops)]
+    if not len(tops):
+        return np.nan
+    return float(tops.max())
+
+
+def trim_heights(z_want, top):
+    """
+    The heights of z_want whose height bin, reaching halfway to the
+    neighbouring heights, starts below top. top may also be the scan_top
+    of several scans, whose highest is used, as the profiles of all of
+    them share the grid. NaN values are ignored and z_want is kept whole
+    if all are NaN.
+    """
+    z_want = np.asarray(z_want)
+    top = np.atleast_1d(np.asarray(top, dtype=np.float64))
+    top = top[np.isfinite(top)]
+    if not len(top):
+        return z_want
+    lower_edges = (z_want[:-1] + z_want[1:]) / 2.0
+    return z_want[:np.searchsorted(lower_edges, top.max()) + 1]
@@ -0,0 +1,147 @@
+"""
+vad.vad_index
+=============
+Cheap classification of radar files from their headers.
+
+    read_header
+    index_files
+    select_files
+    usable_records
+
+Only the time, sweep, angle and range variables of a CF/Radial file are
+read, so RHIs, files without the velocity field and volumes already in a
+daily VAD file can be skipped before the full read of the volume, and the
+height reached by each sweep is known for trimming the height grid.
+
+"""
+
+import logging
+
+import netCDF4
+import numpy as np
+
+from .vad_heights import sweep_tops
+
+logger = logging.getLogger(__name__)
+
+# CF/Radial sweep modes of constant elevation scans usable for a VAD.
+_PPI_MODES = ('azimuth_surveillance', 'sector', 'manual_ppi', 'ppi')
+
+
+def _sweep_modes(variable):
+    """ Sweep modes of a CF/Radial char sweep_mode variable. """
+    variable.set_auto_chartostring(False)
+    chars = np.ma.filled(variable[:], b'')
+    return [str(mode).strip().lower()
+            for mode in netCDF4.chartostring(chars)]
+
+
+def read_header(file, vel_field='corrected_velocity'):
+    """
+    Reads the start time and scan type of a radar file without reading
+    its fields.
+
+    Parameters
+    ----------
+    file : str
+        Radar file path.
+    vel_field : str, optional
+        Velocity field the VAD needs.
+
+    Returns
+    -------
+    record : dict
+        The file, its start time as datetime64[s] (None if unreadable),
+        scan_type ('ppi', 'rhi' or the first other sweep mode), number of
+        sweeps, the height of the farthest gate of each sweep, sweep_tops,
+        whether it is usable for a VAD, and the reason it is not.
+
+    """
+    record = {'file': file, 'time': None, 'scan_type': None,
+              'nsweeps': 0, 'sweep_tops': np.array([]), 'usable': False,
+              'reason': 'unreadable'}
+    try:
+        with netCDF4.Dataset(file) as dataset:
+            variables = dataset.variables
+            time = variables['time']
+            start = netCDF4.num2date(time[0], time.units,
+                                     getattr(time, 'calendar', 'standard'),
+                                     only_use_cftime_datetimes=False,
+                                     only_use_python_datetimes=True)
+            modes = _sweep_modes(variables['sweep_mode'])
+            fixed_angle = np.ma.filled(variables['fixed_angle'][:], np.nan)
+            ranges = np.ma.filled(variables['range'][:], np.nan)
+            has_field = vel_field in variables
+    except (OSError, KeyError, IndexError, ValueError):
+        return record
+
+    if all(mode in _PPI_MODES for mode in modes):
+        scan_type = 'ppi'
+    elif 'rhi' in modes or 'manual_rhi' in modes:
+        scan_type = 'rhi'
+    else:
+        scan_type = modes[0] if modes else 'unknown'
+
+    record.update(time=np.datetime64(start.replace(microsecond=0), 's'),
+                  scan_type=scan_type, nsweeps=len(modes), reason=None)
+    if scan_type == 'ppi':
+        record['sweep_tops'] = sweep_tops(ranges, fixed_angle)
+    if scan_type != 'ppi':
+        record['reason'] = scan_type
+    elif not has_field:
+        record['reason'] = 'no ' + vel_field
+    elif not np.any(np.abs(fixed_angle) < 90.0):
+        record['reason'] = 'vertical'
+    record['usable'] = record['reason'] is None
+    return record
+
+
+def index_files(files, vel_field='corrected_velocity', exclude_times=None):
+    """
+    Header records of radar files, see read_header.
+
+    Parameters
+    ----------
+    files : list
+        Radar file paths.
+    vel_field : str, optional
+        Velocity field the VAD needs.
+    exclude_times : array, optional
+        Times of profiles already processed, e.g. the times of a daily
+        VAD file. Files starting at one of them, to the second, are marked
+        unusable with the reason 'processed'.
+
+    Returns
+    -------
+    records : list
+        A record for every file, in the order of files.
+
+    """
+    if exclude_times is None:
+        exclude_times = []
+    exclude_times = np.asarray(exclude_times, dtype='datetime64[s]')
+    records = [read_header(file, vel_field) for file in files]
+    for record in records:
+        if record['usable'] and np.isin(record['time'], exclude_times):
+            record.update(usable=False, reason='processed')
+    return records
+
+
+def select_files(files, vel_field='corrected_velocity', exclude_times=None):
+    """
+    The radar files usable for a VAD and not yet processed, in the order
+    of files. Arguments are those of index_files.
+    """
+    return [record['file'] for record in
+            usable_records(index_files(files, vel_field, exclude_times))]
+
+
+def usable_records(records):
+    """ The usable records of index_files, logging why others are not. """
+    usable = []
+    for record in records:
+        if record['usable']:
+            usable.append(record)
+        else:
+            logger.debug('Skipping %s: %s', record['file'], record['reason'])
+    return usable
@@ -1,17 +1,152 @@
+import copy
 import numpy as np
 import pandas as pd
 import pyart
 import xarray
 import netCDF4
 import datetime
+import os
 import sys
 import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .config import get_encoding, get_metadata, get_qc_thresholds
+from .default_config import _QC_FIELDS, _QC_FLAGS
+from .vad_buffer import ProfileBuffer
+from .vad_cache import ResultCache
+from .vad_catalog import Catalog
+from .vad_heights import adaptive_heights, scan_top, trim_heights
+from .vad_index import index_files, usable_records
+from .vad_timing import StageTimer, peak_memory
+from . import vad_consensus, vad_retrieve, vad_zarr
+
+
+def read_radar(file, vel_field, sweeps=None):
+    """
+    Reads only what the VAD retrieval needs from a radar file.
+
+    Only the velocity field is included and its data is not loaded until
+    the retrieval accesses it. The radar geometry and time are always read.
+
+    Parameters
+    ----------
+    file : str
+        Radar file path.
+    vel_field : str
+        Velocity field used for the VAD calculation.
+    sweeps : array, optional
+        Indices of the sweeps to keep. None keeps all sweeps.
+
+    Returns
+    -------
+    radar : Radar
+        Radar object containing only vel_field.
+
+    """
+    radar = pyart.io.read(file, include_fields=[vel_field],
+                          delay_field_loading=True)
+    if sweeps is not None:
+        radar = radar.extract_sweeps(sweeps)
+    return radar
+
+
+_ENGINES = ('pyart', 'native')
+_GEOMETRY = ('time', 'range', 'azimuth', 'elevation', 'fixed_angle')
+
+
+def _loaded_bytes(radar, vel_field):
+    """
+    Bytes of the velocity field and geometry data of a radar read by
+    read_radar, loading the field if still delayed. Only the kept sweeps
+    are counted.
+    """
+    arrays = [radar.fields[vel_field]['data']]
+    arrays += [getattr(radar, name)['data'] for name in _GEOMETRY]
+    return int(sum(np.asarray(array).nbytes for array in arrays))
+
+
+def _retrieve_file(file, vel_field, z_want, kwargs, sweeps=None,
+                   engine='pyart', cache=None, qc=None):
+    """
+    Reads a single radar file and retrieves its VAD profile.
+
+    This is the unit of work sent to worker processes, so only the small
+    per-height profile arrays are returned rather than the radar object.
+    None is returned if the file can not be read. When a ResultCache is
+    given, the profile is served from it if present and stored otherwise.
+    The result's 'timing' is the file's record for a StageTimer. When qc
+    thresholds are given, the per height quality control statistics of
+    the native engine are included and failed heights are masked.
+
+    """
+    start = time.time()
+    if cache is not None:
+        params = (vel_field, np.asarray(z_want), kwargs, sweeps, engine)
+        if qc is not None:
+            params += (tuple(sorted(qc.items())),)
+        key = cache.key(file, params)
+        result = cache.get(key)
+        if result is not None:
+            result['timing'] = {'file': file, 'cached': True, 'bytes': 0,
+                                'stages': {'cache': time.time() - start},
+                                'peak_memory': peak_memory()}
+            return result
+
+    start = time.time()
+    try:
+        radar = read_radar(file, vel_field, sweeps=sweeps)
+    except TypeError:
+        return None
+
+    # Loads the delayed velocity field, so its read is timed as one.
+    nbytes = _loaded_bytes(radar, vel_field)
+    read = time.time() - start
+
+    volume_time = netCDF4.num2date(radar.time['data'][0],
+                                   radar.time['units'],
+                                   only_use_cftime_datetimes=False,
+                                   only_use_python_datetimes=True)
+    if engine == 'native':
+        retrieval = vad_retrieve.velocity_azimuth_display
+    else:
+        retrieval = pyart.retrieve.velocity_azimuth_display
+    start = time.time()
+    if qc is not None:
+        vad, statistics = vad_retrieve.velocity_azimuth_display_qc(
+            radar, vel_field=vel_field, z_want=z_want, thresholds=qc,
+            **kwargs)
+    else:
+        vad = retrieval(radar, vel_field=vel_field, z_want=z_want, **kwargs)
+        statistics = {}
+    retrieve = time.time() - start
+
+    result = {'time': volume_time,
+              'u_wind': vad.u_wind,
+              'v_wind': vad.v_wind,
+              'speed': vad.speed,
+              'direction': vad.direction,
+              'altitude': radar.altitude['data'],
+              'longitude': radar.longitude['data'],
+              'latitude': radar.latitude['data']}
+    result.update(statistics)
+    if cache is not None:
+        cache.put(key, result)
+    result['timing'] = {'file': file, 'cached': False, 'bytes': nbytes,
+                        'stages': {'read': read, 'retrieve': retrieve},
+                        'peak_memory': peak_memory()}
+    return result
+
 
-from .config import get_metadata
 class vad():
     """ Class for creating VAD objects for ploting. """
     
-    def __init__(self, files, vel_field=None, z_want=None, gatefilter=None):
+    def __init__(self, files, vel_field=None, z_want=None, gatefilter=None,
+                 n_workers=None, executor=None, chunk_size=None,
+                 spill_config=None, file_directory=None, sweeps=None,
+                 engine=None, cache=None, index=False, qc=None,
+                 trim=False):
         """
         Velocity Azimuth Display
         
@@ -21,8 +156,10 @@ class vad():
             list of radar file path.
         vel_field : string, optional
             Velocity field used for VAD calculation
-        z_want : array. optional
-            Heights for where to sample vads from.
+        z_want : array or str, optional
+            Heights for where to sample vads from, or 'adaptive' for the
+            grid of vad.vad_heights.adaptive_heights, finer near the
+            surface and coarser aloft.
             None will default to np.linspace(0, 10000, 101).
         
         Optional Parameters
@@ -30,73 +167,294 @@ class vad():
         gatefilter : GateFilter
             A GateFilter indicating radar gates that should be excluded
             from the import vad calculation.
+        n_workers : int
+            Number of worker processes used to read and retrieve the
+            radar files in parallel. None or 1 processes the files serially.
+        executor : concurrent.futures.Executor
+            An existing executor to submit the per file retrievals to.
+            Takes precedence over n_workers and is not shut down.
+        chunk_size : int
+            Number of profiles the profile buffer grows by, and the number
+            held in memory before spilling. None defaults to 288, a day of
+            5 minute volumes.
+        spill_config : str
+            A string of the radar name found from config.py. When given,
+            every completed chunk of profiles is written to the daily
+            NetCDF files of that radar as it is produced, so memory use
+            does not grow with the number of files. A new daily file is
+            started whenever the date changes. The files should be given
+            in time order and write does not need to be called afterwards.
+        file_directory : str
+            File path to the output folder used when spilling. Defaults to
+            the users home directory.
+        sweeps : array
+            Indices of the sweeps used for the VAD. None uses all sweeps.
+        engine : str
+            VAD retrieval used for each volume, either 'pyart' for
+            pyart.retrieve.velocity_azimuth_display or 'native' for the
+            vectorized vad.vad_retrieve.velocity_azimuth_display.
+            None defaults to 'pyart'.
+        cache : ResultCache or str
+            Cache of per file VAD results consulted before retrieving a
+            file, or the folder of one. None retrieves every file.
+        index : bool
+            If True, only the header of each file is read first and files
+            that are not PPI volumes with vel_field, e.g. RHIs, are skipped
+            before the full read, see vad.vad_index.
+        qc : bool or dict
+            If True, or a dict of thresholds overriding those in
+            default_config, the fit RMS, number of valid gates and
+            azimuthal gap of every height are computed with the native
+            engine's fits, heights failing a threshold are masked, and
+            write adds the statistics, qc_flag and the counts of each
+            failed test. Requires engine='native'.
+        trim : bool
+            If True, heights above the farthest gate of the highest of
+            the used sweeps are dropped from z_want. The gate heights come
+            from the file headers, read once together with index. As all
+            profiles share z_want, the highest scan sets the grid, while
+            the levels above each scan's own top are masked and cost no
+            work per volume. The heights then depend on the files, so
+            trimmed profiles should not be appended to files written
+            without it.
         
         """
-        self.u_wind = []
-        self.v_wind = []
-        self.speed = []
-        self.direction = []
-        self.time = []
-        self.base_time = []
-        
         if vel_field is None:
             self.vel_field = 'corrected_velocity'
         else:
             self.vel_field = vel_field
         
+        self.timing = StageTimer()
+        records = None
+        if index or trim:
+            # One header pass serves both the file selection and the trim.
+            with self.timing.stage('index'):
+                records = usable_records(index_files(files, self.vel_field))
+            if index:
+                files = [record['file'] for record in records]
+
         if z_want is None:
             self.z_want = np.linspace(0, 10000, 100)
+        elif isinstance(z_want, str) and z_want == 'adaptive':
+            self.z_want = adaptive_heights()
         else:
             self.z_want = z_want
+        if trim and records:
+            self.z_want = trim_heights(
+                self.z_want, [scan_top(record['sweep_tops'], sweeps)
+                              for record in records])
+
+        if engine is None:
+            engine = 'pyart'
+        if engine not in _ENGINES:
+            raise ValueError('Unknown VAD engine: ' + str(engine)
+                             + '. Options are ' + ', '.join(_ENGINES))
+        self.engine = engine
+
+        if isinstance(cache, str):
+            cache = ResultCache(cache)
+        self.cache = cache
+
+        if qc is None or qc is False:
+            self.qc = None
+        else:
+            if engine != 'native':
+                raise ValueError("Quality control requires engine='native'.")
+            self.qc = get_qc_thresholds(None if qc is True else qc)
+
+        if chunk_size is None:
+            chunk_size = 288
+
+        self.hght = np.array(self.z_want)
+        fields = ('u_wind', 'v_wind', 'speed', 'direction')
+        if self.qc is not None:
+            fields += _QC_FIELDS
+        self._buffer = ProfileBuffer(len(self.hght), chunk_size=chunk_size,
+                                     fields=fields)
+        self._spill = spill_config
+        self._spill_directory = file_directory
+        self._spill_paths = []
+        self.sweeps = sweeps
+        self.consensus_profiles = None
+        self._consensus_comment = None
+
+        self.create_vad(files, n_workers=n_workers, executor=executor)
+
+    @property
+    def uwind(self):
+        """ Eastward wind component, (time, height). """
+        return self._buffer['u_wind']
+
+    @property
+    def vwind(self):
+        """ Northward wind component, (time, height). """
+        return self._buffer['v_wind']
+
+    @property
+    def spd(self):
+        """ Horizontal wind speed, (time, height). """
+        return self._buffer['speed']
+
+    @property
+    def dir(self):
+        """ Horizontal wind direction, (time, height). """
+        return self._buffer['direction']
+
+    @property
+    def t(self):
+        """ Profile times as datetime64[ns]. """
+        return self._buffer.time
+
+    @property
+    def bt(self):
+        """ Base time, seconds since 1970-1-1 of the first profile. """
+        return np.array([netCDF4.date2num(
+            pd.Timestamp(self.t[0]).to_pydatetime(),
+            'seconds since 1970-1-1 0:00:00 0:00')], dtype=np.int32)
         
-        self.create_vad(files)
-        
-    def create_vad(self, files, **kwargs):
+    def create_vad(self, files, n_workers=None, executor=None, **kwargs):
         """
         Creates a VAD object containing u & v wind components,
         wind speed, direction, and height.
+
+        When n_workers is greater than one, or an executor is given, each
+        file is read and retrieved in a separate process and the profiles
+        are reassembled in time order.
+
+        The wall time of the whole call is recorded as the 'create_vad'
+        stage of vad.timing, and the read and retrieve times, bytes of
+        radar data loaded and peak memory of every file as its file
+        records.
         
         """
-        for file in files:
-            try:
-                radar = pyart.io.read(file)
-            except TypeError:
+        start = time.time()
+        retrieve = self._retriever(kwargs)
+        if executor is not None:
+            self._collect(executor.map(retrieve, files))
+        elif n_workers is not None and n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                self._collect(pool.map(retrieve, files))
+        else:
+            self._collect(retrieve(file) for file in files)
+
+        if self._spill is not None:
+            self._flush()
+        else:
+            self._buffer.sort()
+        self.timing.add('create_vad', time.time() - start)
+
+    def _retriever(self, kwargs):
+        """
+        The per file retrieval with this object's settings, a picklable
+        function of a file path returning the result of _retrieve_file.
+        """
+        return partial(_retrieve_file, vel_field=self.vel_field,
+                       z_want=self.z_want, kwargs=kwargs,
+                       sweeps=self.sweeps, engine=self.engine,
+                       cache=self.cache, qc=self.qc)
+
+    def consensus(self, nvolumes=None, window=None, method='median',
+                  max_gap=None, min_count=1, threshold=3.0):
+        """
+        Computes rolling consensus winds of the profiles, which write adds
+        as u_wind_consensus, v_wind_consensus, speed_consensus,
+        direction_consensus and consensus_count variables.
+
+        Parameters
+        ----------
+        nvolumes : int
+            Window of nvolumes consecutive profiles centered on each one.
+        window : timedelta
+            Window of the profiles within window / 2 of each one. Only one
+            of nvolumes and window is given.
+        method : str
+            'median', 'mean' or 'robust_mean', the mean of the values
+            within threshold scaled median absolute deviations of the
+            median.
+        max_gap : timedelta
+            Windows do not extend across gaps between volumes longer than
+            max_gap, e.g. scan outages.
+        min_count : int
+            Heights with fewer valid values in a window are masked.
+        threshold : float
+            Outlier threshold of 'robust_mean'.
+
+        Returns
+        -------
+        profiles : dict
+            (time, height) u_wind, v_wind, speed, direction and count.
+
+        """
+        with self.timing.stage('consensus'):
+            self.consensus_profiles = vad_consensus.consensus(
+                self.t, self.uwind, self.vwind, nvolumes=nvolumes,
+                window=window, method=method, max_gap=max_gap,
+                min_count=min_count, threshold=threshold)
+        if nvolumes is not None:
+            extent = str(nvolumes) + ' volumes'
+        else:
+            extent = str(pd.Timedelta(window))
+        comment = ('Rolling ' + method + ' of the profiles within '
+                   + extent + ', ignoring masked values')
+        if max_gap is not None:
+            comment += ', not across gaps longer than ' + str(
+                pd.Timedelta(max_gap))
+        self._consensus_comment = comment
+        return self.consensus_profiles
+
+    def _collect(self, results):
+        """ Writes each retrieved profile into the profile buffer. """
+        for result in results:
+            if result is None:
                 continue
+            self.timing.add_file(result.pop('timing'))
+            self._buffer.append(result['time'].replace(microsecond=0),
+                                result)
+            self.alt = np.array(result['altitude'])
+            self.lon = np.array(result['longitude'])
+            self.lat = np.array(result['latitude'])
+            if self._spill is not None and self._buffer.full:
+                self._flush()
 
+    def _flush(self):
+        """
+        Writes the buffered profiles to the spill files of their dates,
+        creating each on its first chunk, and empties the buffer.
 
-            time = netCDF4.num2date(radar.time['data'][0],
-                                    radar.time['units'])
-            rtime = datetime.datetime.strftime(
-                time, '%Y-%m-%dT%H:%M:%S')
-            vad = pyart.retrieve.velocity_azimuth_display(
-                radar, vel_field=self.vel_field,
-                z_want=self.z_want, **kwargs)
-
-            self.u_wind.append(vad.u_wind)
-            self.v_wind.append(vad.v_wind)
-            self.time.append(rtime)
-            self.speed.append(vad.speed)
-            self.direction.append(vad.direction)
-            self.base_time.append(time)
-            altitude = radar.altitude['data']
-            longitude = radar.longitude['data']
-            latitude = radar.latitude['data']
-            height = self.z_want
-
-        self.uwind = np.array(self.u_wind)
-        self.vwind = np.array(self.v_wind)
-        self.t = np.array(self.time, dtype='datetime64[ns]')
-        self.bt = np.array([netCDF4.date2num(self.base_time[0],
-                                             'seconds since 1970-1-1 0:00:00 0:00')],
-                           dtype=np.int32)
-        self.dir = np.array(self.direction)
-        self.hght = np.array(height)
-        self.spd = np.array(self.speed)
-        self.alt = np.array(altitude)
-        self.lon = np.array(longitude)
-        self.lat = np.array(latitude)
+        """
+        if len(self._buffer) == 0:
+            return
+        for rows in _day_rows(self.t):
+            day = self._subset(rows)
+            path = _daily_path(self._spill, self._spill_directory, day.t[0])
+            if path in self._spill_paths:
+                start = time.time()
+                _append_profiles(path, day.t, day._buffer)
+                self.timing.add('write', time.time() - start)
+            else:
+                day.write(self._spill, self._spill_directory)
+                self._spill_paths.append(path)
+        self._buffer.clear()
+
+    def _subset(self, rows):
+        """
+        A shallow copy of this object holding only the profiles in rows.
+        The timer is shared, so the writes of the copy are recorded here.
+        """
+        subset = copy.copy(self)
+        subset._buffer = ProfileBuffer(len(self.hght),
+                                       chunk_size=max(len(rows), 1),
+                                       fields=self._buffer.fields)
+        subset._buffer.extend(self.t[rows], dict(
+            (name, self._buffer[name][rows]) for name in self._buffer.fields))
+        if self.consensus_profiles is not None:
+            subset.consensus_profiles = dict(
+                (name, values[rows])
+                for name, values in self.consensus_profiles.items())
+        return subset
         
-    def write(self, config, file_directory=None):
+    def write(self, config, file_directory=None, append=False,
+              encoding='float32', catalog=None):
         """
         Writes VAD file to a netCDF output
         
@@ -111,17 +469,115 @@ class vad():
         file_directory : str
             File path to the file output folder of which to save the VAD netCDF files.
             If no file path is given, file path defaults to users home directory.
+        append : bool
+            If True and the daily file already exists, only profiles whose
+            times are not yet in the file are appended along its time
+            dimension instead of rewriting the whole day. New profiles
+            are written after the existing ones.
+        encoding : str or dict
+            Storage of the wind variables, either the name of an encoding
+            in default_config, 'float32' or the scaled 'int16', or a dict
+            of xarray encodings for u_wind, v_wind, speed and direction.
+            Ignored when appending to an existing file.
+            Consensus winds computed with vad.consensus use the encoding
+            of their wind variable, and are only written when the file
+            is created.
+        catalog : Catalog or str
+            A vad.vad_catalog.Catalog, or the path of its database, in
+            which the written file is recorded.
+
+        Returns
+        -------
+        path : str or list
+            File path of the written VAD netCDF file. Profiles spanning
+            several dates are written to the daily file of each date and
+            the list of those paths is returned.
             
         """
-        if file_directory is None:
-            file_directory = os.path.expanduser('~')
+        days = _day_rows(self.t)
+        if len(days) > 1:
+            return [self._subset(rows).write(config, file_directory, append,
+                                             encoding, catalog)
+                    for rows in days]
+
+        start = time.time()
+        path = _daily_path(config, file_directory, self.t[0])
+
+        if append and os.path.exists(path):
+            new = ~np.isin(self.t, _read_times(path))
+            if new.any():
+                _append_profiles(path, self.t[new], dict(
+                    (name, self._buffer[name][new])
+                    for name in self._buffer.fields))
+            self.timing.add('write', time.time() - start)
+            _record(catalog, path)
+            return path
         
+        ds = self._to_dataset(config)
+        if isinstance(encoding, str):
+            encoding = get_encoding(encoding, len(self.hght))
+            for name in list(encoding):
+                if name + '_consensus' in ds:
+                    encoding[name + '_consensus'] = dict(encoding[name])
+            for name in _QC_FIELDS:
+                if name in ds:
+                    encoding[name] = {'zlib': True, 'complevel': 4}
+        encoding = dict(encoding)
+        for name, variable in encoding.items():
+            # A packed fill value replaces the -9999 of the float variables.
+            if '_FillValue' in variable and name in ds:
+                ds[name].attrs.pop('_FillValue', None)
+        encoding.update({'time': {'units': 'seconds since ' + str(self.t[0]),
+                                  'calendar': 'gregorian'},
+                         'time_offset': {'units': 'seconds since ' + str(self.t[0]),
+                                         'calendar': 'gregorian'}})
+        ds.to_netcdf(path=path, encoding=encoding, unlimited_dims='time')
+        self.timing.add('write', time.time() - start, os.path.getsize(path))
+        _record(catalog, path)
+        return path
+
+    def write_zarr(self, config, store=None, region=False):
+        """
+        Writes the VAD profiles to a Zarr store holding every profile of a
+        radar, see vad.vad_zarr.
+
+        Parameters
+        ----------
+        config : str
+            A string of the radar name found from config.py that contains values
+            for writing, specific to that radar.
+
+        Optional Parameters
+        -------------------
+        store : str
+            Path of the Zarr store. Defaults to <datastream>.zarr in the
+            users home directory.
+        region : bool
+            If False, the store is created if needed and profiles whose
+            times are not yet stored are appended along time. If True,
+            the profiles are written into their slots of a store created
+            by vad.vad_zarr.create_zarr, so workers holding disjoint
+            times can write in parallel.
+
+        Returns
+        -------
+        store : str
+            Path of the Zarr store.
+
+        """
+        return vad_zarr.write_zarr(self, config, store=store, region=region)
+
+    def _to_dataset(self, config):
+        """
+        Returns the profiles as an xarray Dataset with the ARM attributes
+        of config, as written by write.
+        """
         attributes = get_metadata(config)
-        
+
         ds = xarray.Dataset()
         ds['base_time'] = xarray.Variable('base_time', self.bt,
-                                          attrs={'string': datetime.datetime.strftime(
-                                              self.base_time[0], '%d-%b-%Y,%H:%M:%S GMT'),
+                                          attrs={'string': pd.to_datetime(
+                                              self.t[0]).strftime('%d-%b-%Y,%H:%M:%S GMT'),
                                                  'units': 'seconds since 1970-1-1 0:00:00 0:00',
                                                  'long_name': 'Base time in Epoch',
                                                  'ancillary_variables': 'time_offset',
@@ -177,15 +633,13 @@ class vad():
                                            'units': 'm', 
                                            'long_name': 'Altitude above mean sea level',
                                            '_FillValue': False})
-        
-        encoding = {'time': {'units': 'seconds since ' + str(self.t[0]),
-                             'calendar': 'gregorian'},
-                    'time_offset': {'units': 'seconds since ' + str(self.t[0]),
-                                    'calendar': 'gregorian'}}
-        
+
+        if self.qc is not None:
+            self._add_qc(ds)
+        if self.consensus_profiles is not None:
+            self._add_consensus(ds)
+
         ds.attrs=attributes
-        date = pd.to_datetime(
-            np.array(self.time[0], dtype='datetime64[ns]')).strftime('%Y%m%d')
         
         
         command_line = ''
@@ -197,6 +651,140 @@ class vad():
                                + datetime.datetime.utcnow().strftime(
                                    '%Y-%m-%dT%H:%M:%S.%f')
                                + ' using PyART')
-        ds.squeeze(dim=None, drop=False).to_netcdf(path= file_directory + '/' + attributes['datastream'] 
-                                                   + '.' + str(date) + '.000000.nc', encoding=encoding,
-                                                   unlimited_dims='time')
\ No newline at end of file
+        return ds.squeeze(dim=['base_time', 'longitude', 'latitude',
+                               'altitude'], drop=False)
+
+
+    def _add_qc(self, ds):
+        """ Adds the quality control statistics and flags to ds. """
+        dims = ['time', 'height']
+        flag = np.ma.filled(self._buffer['qc_flag'], 0).astype(np.int32)
+        ds['fit_rms'] = xarray.Variable(
+            dims, self._buffer['fit_rms'],
+            attrs={'units': 'm/s', '_FillValue': -9999,
+                   'long_name': 'RMS residual of the radial velocity fits'})
+        ds['valid_gates'] = xarray.Variable(
+            dims, np.ma.filled(self._buffer['valid_gates'], 0).astype(
+                np.int32),
+            attrs={'units': '1',
+                   'long_name': 'Number of valid velocity gates fitted'})
+        ds['azimuth_gap'] = xarray.Variable(
+            dims, self._buffer['azimuth_gap'],
+            attrs={'units': 'degree', '_FillValue': -9999,
+                   'long_name': 'Largest azimuthal gap between valid '
+                                'rays of the fits'})
+        ds['qc_flag'] = xarray.Variable(
+            dims, flag,
+            attrs={'long_name': 'Quality check results on the winds',
+                   'units': '1',
+                   'flag_masks': np.array([bit for _, bit in _QC_FLAGS],
+                                          dtype=np.int32),
+                   'flag_meanings': ' '.join(name for name, _ in _QC_FLAGS),
+                   'flag_counts': _flag_counts(flag),
+                   'comment': 'Winds are masked where any flag is set. '
+                              'flag_counts holds the number of profile '
+                              'heights failing each test.',
+                   'min_gates': self.qc['min_gates'],
+                   'max_rms': self.qc['max_rms'],
+                   'max_azimuth_gap': self.qc['max_azimuth_gap']})
+
+    def _add_consensus(self, ds):
+        """ Adds the consensus winds of vad.consensus to ds. """
+        profiles = self.consensus_profiles
+        if len(profiles['count']) != len(self.t):
+            raise ValueError('The consensus winds are out of date, '
+                             'call vad.consensus again.')
+        for name in ['u_wind', 'v_wind', 'speed', 'direction']:
+            attrs = dict(ds[name].attrs)
+            long_name = attrs['long_name']
+            attrs['long_name'] = ('Consensus ' + long_name[0].lower()
+                                  + long_name[1:])
+            attrs['comment'] = self._consensus_comment
+            ds[name + '_consensus'] = xarray.Variable(
+                ['time', 'height'], profiles[name], attrs=attrs)
+        ds['consensus_count'] = xarray.Variable(
+            ['time', 'height'], profiles['count'],
+            attrs={'units': '1',
+                   'long_name': 'Number of profiles in the consensus'})
+
+
+def _flag_counts(flag):
+    """ Number of values of qc_flag with each bit of _QC_FLAGS set. """
+    return np.array([np.count_nonzero(np.asarray(flag) & bit)
+                     for _, bit in _QC_FLAGS], dtype=np.int32)
+
+
+def _day_rows(times):
+    """ Row indices of the times on each date, in date order. """
+    days = np.asarray(times).astype('datetime64[D]')
+    return [np.flatnonzero(days == day) for day in np.unique(days)]
+
+
+def _daily_path(config, file_directory, profile_time):
+    """ Path of the daily VAD file of config holding profile_time. """
+    if file_directory is None:
+        file_directory = os.path.expanduser('~')
+    date = pd.to_datetime(profile_time).strftime('%Y%m%d')
+    return (file_directory + '/' + get_metadata(config)['datastream']
+            + '.' + date + '.000000.nc')
+
+
+def _record(catalog, path):
+    """ Records a written VAD file in catalog, if one is given. """
+    if catalog is None:
+        return
+    if isinstance(catalog, str):
+        catalog = Catalog(catalog)
+    catalog.add(path)
+
+
+def _read_times(path):
+    """ Returns the times in a VAD NetCDF file as datetime64[ns]. """
+    with netCDF4.Dataset(path) as dataset:
+        variable = dataset.variables['time']
+        dates = netCDF4.num2date(variable[:], variable.units,
+                                 getattr(variable, 'calendar', 'standard'),
+                                 only_use_cftime_datetimes=False,
+                                 only_use_python_datetimes=True)
+    return np.array(dates, dtype='datetime64[ns]')
+
+
+def _append_profiles(path, times, profiles):
+    """
+    Appends profiles to an existing VAD NetCDF file along its unlimited
+    time dimension.
+
+    Parameters
+    ----------
+    path : str
+        File path to a VAD NetCDF file created by vad.write.
+    times : array
+        Times of the new profiles as datetime64.
+    profiles : dict or ProfileBuffer
+        (time, height) arrays for u_wind, v_wind, speed and direction,
+        and the quality control fields if the file holds them.
+
+    """
+    dates = pd.to_datetime(times).to_pydatetime()
+    with netCDF4.Dataset(path, 'a') as dataset:
+        start = len(dataset.dimensions['time'])
+        stop = start + len(dates)
+        for name in ['time', 'time_offset']:
+            variable = dataset.variables[name]
+            variable[start:stop] = netCDF4.date2num(
+                dates, variable.units, getattr(variable, 'calendar',
+                                               'standard'))
+        for name in ['u_wind', 'v_wind', 'speed', 'direction']:
+            dataset.variables[name][start:stop, :] = profiles[name]
+        if ('qc_flag' in dataset.variables
+                and 'qc_flag' in getattr(profiles, 'fields', profiles)):
+            for name in _QC_FIELDS:
+                variable = dataset.variables[name]
+                values = profiles[name]
+                if variable.dtype.kind == 'i':
+                    # As in _add_qc, integer fields hold 0 where masked.
+                    values = np.ma.filled(values, 0).astype(variable.dtype)
+                variable[start:stop, :] = values
+            variable = dataset.variables['qc_flag']
+            variable.flag_counts = variable.flag_counts + _flag_counts(
+                np.ma.filled(profiles['qc_flag'], 0).astype(np.int32))
\ No newline at end of file
@@ -1,18 +1,121 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib
-import datetime
-import xarray
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import ScalarMappable
+from matplotlib.figure import Figure
+import matplotlib.dates as mdates
 import datetime
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from .config import get_plot_values
+from .vad_reader import open_vad
+from .vad_timing import StageTimer
+
+_FONT = {'font.size': 20,
+         'axes.titlesize': 20}
+
+
+class _QuicklookTemplate(object):
+    """
+    Figure, axes, colorbar and labels of a radar's quicklook, built once
+    and reused for every day so only the data artists are redrawn.
+    The read, draw and save times of every image are kept in timing.
+    """
+
+    def __init__(self, config):
+        self.plot_values = get_plot_values(config)
+        self._artists = []
+        self.timing = StageTimer()
+        with matplotlib.rc_context(_FONT):
+            # A bare Figure on the Agg canvas is not tracked by pyplot, so
+            # nothing is left open when quicklooks is called in a loop.
+            self.fig = Figure(figsize=[25,12])
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.add_subplot(111)
+            mappable = ScalarMappable(norm=self.plot_values['norm'],
+                                      cmap=self.plot_values['cmap'])
+            cb = self.fig.colorbar(mappable, ax=self.ax,
+                                   boundaries=self.plot_values['ticks'],
+                                   ticks=self.plot_values['ticks'])
+            cb.set_label('Speed (kts)')
+            self.ax.set_title(' ')
+            self.ax.xaxis_date()
+            self.ax.tick_params(axis='x', labelrotation=45)
+            self.ax.set_ylim(0,10)
+            self.ax.set_ylabel('Height (km)')
+            self.ax.set_xlabel('Time (UTC)')
+
+    def draw(self, file, image_directory, background=False):
+        """ Draws the VAD file onto the template and saves the image. """
+        plot_values = self.plot_values
+        for artist in self._artists:
+            artist.remove()
+        self._artists = []
+
+        start = time.time()
+        with open_vad(file, time_step=6, height_spacing=500.0) as vad:
+            u = vad.u_wind.values/0.514444
+            v = vad.v_wind.values/0.514444
+            z = vad.height.values/1000
+            C = vad.speed.values/0.514444
+            t = vad.time.values
+        date = pd.to_datetime(t[0]).strftime('%Y%m%d')
+        ts = datetime.datetime.strptime(date, '%Y%m%d')
+        read = time.time() - start
+
+        start = time.time()
+        with matplotlib.rc_context(_FONT):
+            X, Y = np.meshgrid(mdates.date2num(pd.to_datetime(t)), z,
+                               indexing='ij')
+            if background:
+                self._artists.append(self.ax.pcolormesh(
+                    X, Y, np.ma.masked_invalid(C),
+                    cmap=plot_values['cmap'], norm=plot_values['norm'],
+                    shading='nearest', alpha=0.3))
+            valid = np.isfinite(u) & np.isfinite(v) & np.isfinite(C)
+            self._artists.append(self.ax.barbs(
+                X[valid], Y[valid], u[valid], v[valid], C[valid],
+                cmap=plot_values['cmap'], norm=plot_values['norm'],
+                sizes=dict(emptybarb=0.1), rounding=False,
+                length=7, clip_on=False))
 
-def quicklooks(file, config, image_directory=None):
+            self.ax.set_title(plot_values['title'] + str(ts) + ' - '
+                              + str(ts + datetime.timedelta(days=1)))
+            self.ax.set_xlim(ts, (ts + datetime.timedelta(days=1)))
+            self.ax.set_ylim(0,10)
+
+            path = (image_directory + '/' + plot_values['save_name']
+                    + '.' + str(date) + '.000000.png')
+            draw = time.time() - start
+            start = time.time()
+            self.fig.savefig(path, bbox_inches='tight')
+        self.timing.add_file({'file': file, 'bytes': os.path.getsize(file),
+                              'stages': {'quicklook_read': read,
+                                         'quicklook_draw': draw,
+                                         'quicklook_save':
+                                             time.time() - start}})
+        return path
+
+
+def _draw_files(files, config, image_directory, background):
+    """
+    Draws a list of VAD files with a single template. Returns the image
+    paths and the template's timing.
+    """
+    template = _QuicklookTemplate(config)
+    paths = [template.draw(file, image_directory, background)
+             for file in files]
+    return paths, template.timing
+
+
+def quicklooks(file, config, image_directory=None, background=False,
+               timer=None):
     """
     Quicklook, produces a single image using a VAD object netCDF file.
-    
+
     Parameters
     ----------
     file : str
@@ -20,56 +123,83 @@ def quicklooks(file, config, image_directory=None):
     config : str
         A string of the radar name found from config.py that contains values
         for writing, specific to that radar
-    
+
     Other Parameters
     ----------------
     image_directory : str
         File path to the image folder to save the VAD image. If no
         image file path is given, image path deafults to users home directory.
-        
+    background : bool
+        If True, the wind speed is drawn as a colored mesh behind the barbs.
+    timer : StageTimer
+        A vad.vad_timing.StageTimer, e.g. vad.timing, the read, draw and
+        save times are added to.
+
+    Returns
+    -------
+    path : str
+        File path of the saved image.
+
+    """
+    if image_directory is None:
+        image_directory = os.path.expanduser('~')
+    paths, timing = _draw_files([file], config, image_directory, background)
+    if timer is not None:
+        timer.merge(timing)
+    return paths[0]
+
+
+def quicklooks_batch(files, config, image_directory=None, background=False,
+                     n_workers=None, timer=None):
+    """
+    Quicklooks of many VAD netCDF files of one radar, e.g. a month of
+    daily files. Each worker builds the figure once and only redraws the
+    data for every file.
+
+    Parameters
+    ----------
+    files : list
+        File paths to the VAD NetCDF files. vad.vad_batch.daily_files
+        returns the daily files of a date range.
+    config : str
+        A string of the radar name found from config.py that contains values
+        for writing, specific to that radar
+
+    Other Parameters
+    ----------------
+    image_directory : str
+        File path to the image folder to save the VAD images. If no
+        image file path is given, image path deafults to users home directory.
+    background : bool
+        If True, the wind speed is drawn as a colored mesh behind the barbs.
+    n_workers : int
+        Number of worker processes the files are split across. None or 1
+        draws every file in the calling process.
+    timer : StageTimer
+        A vad.vad_timing.StageTimer the read, draw and save times of every
+        image, and the peak memory of the workers, are added to.
+
+    Returns
+    -------
+    paths : list
+        File paths of the saved images, in the order of files.
+
     """
     if image_directory is None:
         image_directory = os.path.expanduser('~')
-    plot_values = get_plot_values(config)
-    vad = xarray.open_dataset(file)
-    
-    u = vad.u_wind.data[::6,::5]/0.514444
-    v = vad.v_wind.data[::6,::5]/0.514444
-    z = vad.height.data[::5]/1000
-    C = vad.speed.data[::6,::5]/0.514444
-    t = vad.time[::6].data
-    date = pd.to_datetime(vad.time[0].data).strftime('%Y%m%d')
-    ts = datetime.datetime.strptime(date, '%Y%m%d')
-    
-    
-    fig = plt.figure(figsize=[25,12])
-    font = {'family': 'normal',
-            'size': 20}
-    matplotlib.rc('font', **font)
-    matplotlib.rcParams.update({'font.size': 20})
-    matplotlib.rcParams.update({'axes.titlesize': 20})
-    
-    for i in range(len(t)):
-        Xq, Yq = np.meshgrid(t[i], z)
-        img = plt.barbs(Xq[:,0], Yq[:,0], u[i], v[i],
-                        C[i], cmap = plot_values['cmap'],
-                        norm=plot_values['norm'],
-                        sizes=dict(emptybarb=0.1), rounding=False,
-                        length=7, clip_on=False)
-
-    cb = plt.colorbar(img, cmap=plot_values['cmap'], norm=plot_values['norm'],
-                      boundaries=plot_values['ticks'], ticks=plot_values['ticks'])
-    cb.set_label('Speed (kts)')
-    plt.title(plot_values['title'] + str(ts) + ' - '
-              + str(ts + datetime.timedelta(days=1)))
-    plt.xlim(ts, (ts + datetime.timedelta(days=1)))
-    plt.xticks(rotation=45)
-    plt.ylim(0,10)
-    plt.ylabel('Height (km)')
-    plt.xlabel('Time (UTC)')
-    
-    plt.savefig(image_directory + '/' + plot_values['save_name']
-                + '.' + str(date) + '.000000.png', bbox_inches='tight') 
-    
-    
-    
\ No newline at end of file
+    files = list(files)
+    if n_workers is None or n_workers < 2 or len(files) < 2:
+        results = [_draw_files(files, config, image_directory, background)]
+    else:
+        chunks = [chunk.tolist() for chunk in
+                  np.array_split(np.array(files, dtype=object),
+                                 min(n_workers, len(files)))]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            results = list(pool.map(_draw_files, chunks,
+                                    [config] * len(chunks),
+                                    [image_directory] * len(chunks),
+                                    [background] * len(chunks)))
+    if timer is not None:
+        for paths, timing in results:
+            timer.merge(timing)
+    return [path for paths, timing in results for path in paths]
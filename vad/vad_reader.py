@@ -0,0 +1,63 @@
+"""
+vad.vad_reader
+==============
+Reading VAD NetCDF products.
+
+    open_vad
+
+"""
+
+from contextlib import contextmanager
+
+import numpy as np
+import xarray
+
+
+@contextmanager
+def open_vad(file, time_step=1, height_step=1, time_window=None,
+             chunks=None, height_spacing=None):
+    """
+    Opens a VAD NetCDF file with the time window and decimation applied
+    before any data is read, closing the file on exit.
+
+    Use as ``with open_vad(file, time_step=6) as ds:``. Only the selected
+    values are read from disk when the variables are accessed.
+
+    Parameters
+    ----------
+    file : str
+        File path to the VAD NetCDF file.
+    time_step, height_step : int, optional
+        Keep every time_step-th time and height_step-th height.
+    time_window : tuple, optional
+        (start, end) times, inclusive, to select before decimating.
+    chunks : dict, optional
+        Dask chunks passed to xarray.open_dataset, e.g. {'time': 288}.
+        None reads lazily through the NetCDF backend without dask.
+    height_spacing : float, optional
+        Keep the heights closest to every height_spacing meters instead of
+        every height_step-th height, which thins non-uniform height grids
+        evenly.
+
+    Yields
+    ------
+    ds : Dataset
+        The selected VAD profiles.
+
+    """
+    with xarray.open_dataset(file, chunks=chunks) as ds:
+        if time_window is not None:
+            ds = ds.sel(time=slice(*time_window))
+        heights = slice(None, None, height_step)
+        if height_spacing is not None:
+            heights = _spaced_heights(ds.height.values, height_spacing)
+        yield ds.isel(time=slice(None, None, time_step), height=heights)
+
+
+def _spaced_heights(height, spacing):
+    """ Indices of the heights closest to every spacing meters. """
+    if not len(height):
+        return slice(None)
+    targets = np.arange(height[0], height[-1] + spacing / 2.0, spacing)
+    return np.unique(np.abs(height[:, np.newaxis]
+                            - targets).argmin(axis=0))
@@ -0,0 +1,346 @@
+"""
+vad.vad_retrieve
+================
+Vectorized Velocity Azimuth Display retrieval.
+
+    velocity_azimuth_display
+    velocity_azimuth_display_qc
+
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pyart
+
+from .default_config import _DEFAULT_QC_THRESHOLDS, _QC_FLAGS
+
+# Scan geometry shared by volumes with the same scan strategy, keyed on
+# _scan_signature and limited to the most recently used entries.
+_GEOMETRY_CACHE = OrderedDict()
+_GEOMETRY_CACHE_SIZE = 16
+
+
+def velocity_azimuth_display(radar, vel_field=None, z_want=None,
+                             gatefilter=None):
+    """
+    Velocity azimuth display.
+
+    A drop in replacement for pyart.retrieve.velocity_azimuth_display that
+    fits the harmonic v_r = u_0 + a sin(az) + b cos(az) for every sweep and
+    range gate in a single batched least squares step, then averages the
+    fitted winds onto z_want in a single binning step.
+
+    Parameters
+    ----------
+    radar : Radar
+        Radar object used.
+    vel_field : string, optional
+        Velocity field to use for VAD calculation.
+    z_want : array, optional
+        Heights for where to sample vads from.
+        None will result in np.linspace(0, 10000, 100).
+    gatefilter : GateFilter, optional
+        A GateFilter indicating radar gates that should be excluded
+        from the vad calculation.
+
+    Returns
+    -------
+    vad : HorizontalWindProfile
+        A velocity azimuth display object containing height, speed,
+        direction, u_wind, v_wind from a radar object. Heights without
+        any valid fit are masked.
+
+    """
+    if z_want is None:
+        z_want = np.linspace(0, 10000, 100)
+    if vel_field is None:
+        vel_field = pyart.config.get_field_name('velocity')
+
+    columns, gates, bins = _scan_geometry(radar, z_want)
+    velocities = _velocities(radar, vel_field, gatefilter, columns)
+    starts = radar.sweep_start_ray_index['data']
+    elevation = np.deg2rad(radar.fixed_angle['data'])
+    u_fit, v_fit = _fit_sweeps(velocities, radar.azimuth['data'], starts,
+                               elevation)[:2]
+    u_mean, v_mean = _interval_mean(gates, bins, [u_fit, v_fit],
+                                    len(z_want))
+    return pyart.core.HorizontalWindProfile.from_u_and_v(
+        z_want, u_mean, v_mean)
+
+
+def velocity_azimuth_display_qc(radar, vel_field=None, z_want=None,
+                                gatefilter=None, thresholds=None):
+    """
+    Velocity azimuth display with quality control statistics of every
+    height computed in the same pass.
+
+    The winds are those of velocity_azimuth_display, with heights failing
+    any of the thresholds masked.
+
+    Parameters
+    ----------
+    radar : Radar
+        Radar object used.
+    vel_field : string, optional
+        Velocity field to use for VAD calculation.
+    z_want : array, optional
+        Heights for where to sample vads from.
+        None will result in np.linspace(0, 10000, 100).
+    gatefilter : GateFilter, optional
+        A GateFilter indicating radar gates that should be excluded
+        from the vad calculation.
+    thresholds : dict, optional
+        min_gates, the least number of valid velocity gates, max_rms, the
+        largest fit residual RMS in m/s, and max_azimuth_gap, the largest
+        azimuthal gap in degrees between valid rays of any fit of a
+        height. Missing keys default to those of default_config.
+
+    Returns
+    -------
+    vad : HorizontalWindProfile
+        A velocity azimuth display object with heights failing the
+        quality control masked.
+    qc : dict
+        Per height arrays of fit_rms, valid_gates, azimuth_gap and
+        qc_flag, whose bits are given by default_config._QC_FLAGS.
+
+    """
+    if z_want is None:
+        z_want = np.linspace(0, 10000, 100)
+    if vel_field is None:
+        vel_field = pyart.config.get_field_name('velocity')
+    limits = dict(_DEFAULT_QC_THRESHOLDS)
+    limits.update(thresholds or {})
+
+    columns, gates, bins = _scan_geometry(radar, z_want)
+    velocities = _velocities(radar, vel_field, gatefilter, columns)
+    starts = radar.sweep_start_ray_index['data']
+    elevation = np.deg2rad(radar.fixed_angle['data'])
+    u_fit, v_fit, count, residual = _fit_sweeps(
+        velocities, radar.azimuth['data'], starts, elevation)
+    gaps = _azimuth_gaps(~np.ma.getmaskarray(velocities),
+                         radar.azimuth['data'], starts)
+    u_mean, v_mean = _interval_mean(gates, bins, [u_fit, v_fit],
+                                    len(z_want))
+    qc = _height_statistics(gates, bins, np.ma.getmaskarray(u_fit), count,
+                            residual, gaps, len(z_want))
+
+    flag = np.zeros(len(z_want), dtype=np.int32)
+    with np.errstate(invalid='ignore'):
+        failed = {'no_fit': np.ma.getmaskarray(u_mean),
+                  'too_few_gates': qc['valid_gates'] < limits['min_gates'],
+                  'high_rms': qc['fit_rms'] > limits['max_rms'],
+                  'large_azimuth_gap':
+                      qc['azimuth_gap'] > limits['max_azimuth_gap']}
+    for name, bit in _QC_FLAGS:
+        flag[failed[name]] |= bit
+    qc['qc_flag'] = flag
+
+    rejected = flag != 0
+    return pyart.core.HorizontalWindProfile.from_u_and_v(
+        z_want, np.ma.masked_where(rejected, u_mean),
+        np.ma.masked_where(rejected, v_mean)), qc
+
+
+def _velocities(radar, vel_field, gatefilter, columns=slice(None)):
+    """
+    Radial velocities of the range gates in columns, with invalid and
+    filtered gates masked.
+    """
+    velocities = np.ma.masked_invalid(
+        radar.fields[vel_field]['data'][:, columns])
+    if gatefilter is not None:
+        velocities = np.ma.masked_where(
+            gatefilter.gate_excluded[:, columns], velocities)
+    return velocities
+
+
+def _scan_signature(radar, z_want):
+    """
+    Hashable description of everything the scan geometry depends on:
+    the sweep layout, fixed angles, range gates and the wanted heights.
+    """
+    return (tuple(radar.sweep_start_ray_index['data']),
+            tuple(radar.sweep_end_ray_index['data']),
+            tuple(np.round(radar.fixed_angle['data'], 2)),
+            np.asarray(radar.range['data'], dtype=np.float64).tobytes(),
+            np.asarray(z_want, dtype=np.float64).tobytes())
+
+
+def _scan_geometry(radar, z_want):
+    """
+    Sparse map of the gates onto the heights of z_want, computed once per
+    scan signature and reused by every volume of the same scan.
+
+    Returns
+    -------
+    columns : slice or array
+        Range gates with a sweep inside z_want. Only these are fitted.
+    gates : array
+        Flat indices into (nsweeps, ncolumns) of the gates inside z_want.
+    bins : array
+        Height bin in z_want of each of gates.
+
+    """
+    key = _scan_signature(radar, z_want)
+    if key in _GEOMETRY_CACHE:
+        _GEOMETRY_CACHE.move_to_end(key)
+        return _GEOMETRY_CACHE[key]
+
+    bins = np.digitize(_sweep_heights(radar), _height_edges(z_want)) - 1
+    inside = (bins >= 0) & (bins < len(z_want))
+    columns = np.flatnonzero(inside.any(axis=0))
+    if len(columns) and columns[-1] - columns[0] + 1 == len(columns):
+        # Contiguous gates, the usual case, select a view of the fields.
+        columns = slice(columns[0], columns[-1] + 1)
+    gates = np.flatnonzero(inside[:, columns].ravel())
+    geometry = (columns, gates, bins[:, columns].ravel()[gates])
+    _GEOMETRY_CACHE[key] = geometry
+    if len(_GEOMETRY_CACHE) > _GEOMETRY_CACHE_SIZE:
+        _GEOMETRY_CACHE.popitem(last=False)
+    return geometry
+
+
+def _sweep_heights(radar):
+    """
+    Gate heights above the radar, (nsweeps, ngates), at the fixed angle
+    of each sweep.
+    """
+    _, _, z = pyart.core.antenna_to_cartesian(
+        radar.range['data'][np.newaxis, :] / 1000.0, 0.0,
+        radar.fixed_angle['data'][:, np.newaxis])
+    return z
+
+
+def _fit_sweeps(velocities, azimuth, starts, elevation):
+    """
+    Least squares fit of the first harmonic for every sweep and gate.
+
+    Parameters
+    ----------
+    velocities : MaskedArray
+        Radial velocities, (nrays, ngates). Masked gates are excluded.
+    azimuth : array
+        Ray azimuths in degrees, (nrays,).
+    starts : array
+        Index of the first ray of each sweep. Sweeps must be contiguous.
+    elevation : array
+        Elevation of each sweep in radians, (nsweeps,).
+
+    Returns
+    -------
+    u_fit, v_fit : MaskedArray
+        Horizontal wind components, (nsweeps, ngates). Gates with fewer
+        than three valid rays or degenerate azimuthal coverage are masked.
+    count, residual : array
+        Number of valid rays and residual sum of squares of the fit,
+        (nsweeps, ngates).
+
+    """
+    weight = (~np.ma.getmaskarray(velocities)).astype(np.float64)
+    vel = np.ma.getdata(velocities).astype(np.float64) * weight
+    sin_az = np.sin(np.deg2rad(azimuth))[:, np.newaxis]
+    cos_az = np.cos(np.deg2rad(azimuth))[:, np.newaxis]
+
+    def sweep_sum(values):
+        return np.add.reduceat(values, starts, axis=0)
+
+    count = sweep_sum(weight)
+    sum_v = sweep_sum(vel)
+    sum_s = sweep_sum(weight * sin_az)
+    sum_c = sweep_sum(weight * cos_az)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Covariances about the sweep mean, which removes the u_0 term.
+        ss = sweep_sum(weight * sin_az ** 2) - sum_s ** 2 / count
+        cc = sweep_sum(weight * cos_az ** 2) - sum_c ** 2 / count
+        sc = sweep_sum(weight * sin_az * cos_az) - sum_s * sum_c / count
+        vs = sweep_sum(vel * sin_az) - sum_v * sum_s / count
+        vc = sweep_sum(vel * cos_az) - sum_v * sum_c / count
+        det = ss * cc - sc ** 2
+        a = (vs * cc - vc * sc) / det
+        b = (vc * ss - vs * sc) / det
+        vv = sweep_sum(vel ** 2) - sum_v ** 2 / count
+        residual = np.maximum(vv - a * vs - b * vc, 0.0)
+
+    invalid = (count < 3) | ~(np.abs(det) > 1e-6 * count ** 2)
+    cos_el = np.cos(elevation)[:, np.newaxis]
+    u_fit = np.ma.masked_where(invalid, a / cos_el)
+    v_fit = np.ma.masked_where(invalid, b / cos_el)
+    return u_fit, v_fit, count, residual
+
+
+def _azimuth_gaps(valid, azimuth, starts):
+    """
+    Largest azimuthal gap in degrees between the valid rays of every
+    sweep and gate, (nsweeps, ngates). 360 where fewer than two rays
+    are valid.
+    """
+    stops = np.append(starts[1:], len(azimuth))
+    gaps = np.full((len(starts), valid.shape[1]), 360.0)
+    for sweep, (start, stop) in enumerate(zip(starts, stops)):
+        order = np.argsort(azimuth[start:stop] % 360.0, kind='mergesort')
+        sweep_azimuth = (azimuth[start:stop] % 360.0)[order]
+        sweep_valid = valid[start:stop][order]
+        nray = len(sweep_azimuth)
+        # Index of the closest valid ray before each ray, or -1.
+        index = np.where(sweep_valid, np.arange(nray)[:, np.newaxis], -1)
+        previous = np.maximum.accumulate(index, axis=0)
+        previous = np.concatenate([np.full((1, valid.shape[1]), -1),
+                                   previous[:-1]])
+        inner = np.where(sweep_valid & (previous >= 0),
+                         sweep_azimuth[:, np.newaxis]
+                         - sweep_azimuth[np.maximum(previous, 0)], 0.0)
+        first = np.argmax(sweep_valid, axis=0)
+        last = nray - 1 - np.argmax(sweep_valid[::-1], axis=0)
+        wrap = sweep_azimuth[first] + 360.0 - sweep_azimuth[last]
+        gaps[sweep] = np.where(sweep_valid.sum(axis=0) >= 2,
+                               np.maximum(inner.max(axis=0), wrap), 360.0)
+    return gaps
+
+
+def _height_edges(z_want):
+    """ Bin edges halfway between each height in z_want. """
+    z_want = np.asarray(z_want, dtype=np.float64)
+    half = np.diff(z_want) / 2.0
+    return np.concatenate([[z_want[0] - half[0]], z_want[:-1] + half,
+                           [z_want[-1] + half[-1]]])
+
+
+def _height_statistics(gates, bins, fit_mask, count, residual, gaps,
+                       nheight):
+    """
+    Fit residual RMS, number of valid gates and largest azimuthal gap of
+    the valid fits in each height bin of the gates given by _scan_geometry.
+    """
+    used = ~fit_mask.ravel()[gates]
+    used_gates = gates[used]
+    used_bins = bins[used]
+    valid_gates = np.bincount(used_bins, weights=count.ravel()[used_gates],
+                              minlength=nheight)
+    squares = np.bincount(used_bins, weights=residual.ravel()[used_gates],
+                          minlength=nheight)
+    # Each fit of the three harmonic terms uses three degrees of freedom.
+    freedom = valid_gates - 3 * np.bincount(used_bins, minlength=nheight)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rms = np.where(freedom > 0, np.sqrt(squares / freedom), np.nan)
+    gap = np.full(nheight, np.nan)
+    np.fmax.at(gap, used_bins, gaps.ravel()[used_gates])
+    return {'fit_rms': rms, 'valid_gates': valid_gates, 'azimuth_gap': gap}
+
+
+def _interval_mean(gates, bins, fields, nheight):
+    """
+    Mean of each field in (nsweeps, ncolumns) over the height bins of the
+    gates given by _scan_geometry.
+    """
+    means = []
+    for field in fields:
+        valid = ~np.ma.getmaskarray(field).ravel()[gates]
+        count = np.bincount(bins[valid], minlength=nheight)
+        total = np.bincount(bins[valid],
+                            weights=np.ma.getdata(field).ravel()[gates[valid]],
+                            minlength=nheight)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means.append(np.ma.masked_where(count == 0, total / count))
+    return means
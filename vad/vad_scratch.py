@@ -0,0 +1,272 @@
+"""
+vad.vad_scratch
+===============
+Memory mapped scratch store of raw VAD profiles for long reprocessing.
+
+    ScratchStore
+    retrieve_to_scratch
+
+Every radar file is given a slot of a fixed layout (slot, height, field)
+float32 .npy file, with its time in a sidecar times.npy index. Workers
+write their profile straight into their slot, so only the slot number is
+returned to the parent, and the store is then converted to daily NetCDF
+files or a Zarr store a chunk of slots at a time. Memory use of neither
+step grows with the number of files.
+
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from .default_config import _CHUNK_TIMES
+from .vad_profile import vad
+
+_META = 'meta.json'
+_PROFILES = 'profiles.npy'
+_TIMES = 'times.npy'
+_LOCATIONS = 'locations.npy'
+_LOCATION_FIELDS = ('altitude', 'longitude', 'latitude')
+
+
+class ScratchStore(object):
+    """
+    A directory holding the memory mapped profiles of a reprocessing job.
+
+    Use ScratchStore.create to make a new store and ScratchStore(directory)
+    to open an existing one, e.g. in a worker process.
+
+    Parameters
+    ----------
+    directory : str
+        Folder of the store.
+    mode : str, optional
+        'r+' to write slots, 'r' to only read them.
+
+    """
+
+    def __init__(self, directory, mode='r+'):
+        self.directory = directory
+        with open(os.path.join(directory, _META)) as meta_file:
+            meta = json.load(meta_file)
+        self.heights = np.array(meta['heights'])
+        self.fields = tuple(meta['fields'])
+        self.qc = meta['qc']
+        self.files_hash = meta.get('files_hash')
+        self.profiles = np.load(os.path.join(directory, _PROFILES),
+                                mmap_mode=mode)
+        self.times = np.load(os.path.join(directory, _TIMES), mmap_mode=mode)
+        self.locations = np.load(os.path.join(directory, _LOCATIONS),
+                                 mmap_mode=mode)
+
+    @classmethod
+    def create(cls, directory, heights, nslots,
+               fields=('u_wind', 'v_wind', 'speed', 'direction'), qc=None,
+               files=None):
+        """
+        Creates an empty store of nslots profiles on heights.
+
+        Parameters
+        ----------
+        directory : str
+            Folder of the store. Created if needed.
+        heights : array
+            Heights of the profiles.
+        nslots : int
+            Number of profiles, e.g. the number of radar files.
+        fields : tuple, optional
+            Profile fields stored, those of vad._buffer.fields.
+        qc : dict, optional
+            Quality control thresholds of the retrieval, see vad.vad.
+        files : list, optional
+            Radar file of each slot, whose hash is stored so a resumed job
+            can check it is given the same files.
+
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        shape = (nslots, len(heights), len(fields))
+        profiles = np.lib.format.open_memmap(
+            os.path.join(directory, _PROFILES), mode='w+',
+            dtype=np.float32, shape=shape)
+        profiles[:] = np.nan
+        times = np.lib.format.open_memmap(
+            os.path.join(directory, _TIMES), mode='w+',
+            dtype='datetime64[ns]', shape=(nslots,))
+        times[:] = np.datetime64('NaT')
+        locations = np.lib.format.open_memmap(
+            os.path.join(directory, _LOCATIONS), mode='w+',
+            dtype=np.float64, shape=(nslots, len(_LOCATION_FIELDS)))
+        locations[:] = np.nan
+        for array in [profiles, times, locations]:
+            array.flush()
+        del profiles, times, locations
+        # The metadata is written last, so a store without it is incomplete.
+        with open(os.path.join(directory, _META), 'w') as meta_file:
+            json.dump({'heights': np.asarray(heights).tolist(),
+                       'fields': list(fields), 'qc': qc,
+                       'files_hash': None if files is None
+                       else _files_hash(files)}, meta_file)
+        return cls(directory)
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def filled(self):
+        """ True for every slot holding a profile. """
+        return ~np.isnat(np.asarray(self.times))
+
+    def write(self, slot, result):
+        """
+        Writes a retrieval result, see vad_profile._retrieve_file, into a
+        slot. The time is written last, so a slot only counts as filled
+        once its profile is complete.
+        """
+        self.profiles[slot] = np.stack(
+            [np.ma.filled(np.ma.asarray(result[field], dtype=np.float32),
+                          np.nan) for field in self.fields], axis=-1)
+        self.locations[slot] = [np.ravel(result[name])[0]
+                                for name in _LOCATION_FIELDS]
+        self.profiles.flush()
+        self.locations.flush()
+        self.times[slot] = np.datetime64(
+            result['time'].replace(microsecond=0), 'ns')
+        self.times.flush()
+
+    def chunks(self, chunk_size=_CHUNK_TIMES * 6):
+        """
+        Yields the filled slots in time order as vad objects of at most
+        chunk_size profiles, each holding a single day.
+        """
+        slots = np.flatnonzero(self.filled)
+        slots = slots[np.argsort(np.asarray(self.times)[slots],
+                                 kind='mergesort')]
+        days = np.asarray(self.times)[slots].astype('datetime64[D]')
+        starts = np.flatnonzero(np.concatenate(
+            [[True], days[1:] != days[:-1]]))
+        for start, stop in zip(starts, np.append(starts[1:], len(slots))):
+            for chunk_start in range(start, stop, chunk_size):
+                yield self._vad(slots[chunk_start:min(chunk_start
+                                                      + chunk_size, stop)])
+
+    def _vad(self, slots):
+        """ A vad object holding the profiles of slots. """
+        if self.qc is not None:
+            day = vad([], z_want=self.heights, chunk_size=len(slots),
+                      engine='native', qc=self.qc)
+        else:
+            day = vad([], z_want=self.heights, chunk_size=len(slots))
+        profiles = self.profiles[slots]
+        day._buffer.extend(np.asarray(self.times)[slots], dict(
+            (field, profiles[:, :, i]) for i, field in enumerate(self.fields)))
+        day.alt, day.lon, day.lat = (np.array([value]) for value in
+                                     self.locations[slots[0]])
+        return day
+
+    def write_netcdf(self, config, file_directory=None,
+                     chunk_size=_CHUNK_TIMES * 6, **kwargs):
+        """
+        Writes the profiles to daily VAD NetCDF files a chunk at a time.
+        Existing daily files are appended to. kwargs are passed on to
+        vad.write. Returns the list of written files.
+        """
+        paths = []
+        for day in self.chunks(chunk_size):
+            path = day.write(config, file_directory, append=True, **kwargs)
+            if path not in paths:
+                paths.append(path)
+        return paths
+
+    def write_zarr(self, config, store=None, chunk_size=_CHUNK_TIMES * 6):
+        """
+        Writes the profiles to the radar's Zarr store a chunk at a time,
+        see vad.write_zarr. Returns the path of the store.
+        """
+        for day in self.chunks(chunk_size):
+            store = day.write_zarr(config, store)
+        return store
+
+
+def _files_hash(files):
+    """ SHA-1 of the radar file paths, in slot order. """
+    return hashlib.sha1('\n'.join(os.path.abspath(file) for file in files)
+                        .encode('utf-8')).hexdigest()
+
+
+def _fill_slot(task, retrieve, directory):
+    """
+    Retrieves a radar file into its slot of the store in directory and
+    returns the slot, or None if the file could not be read.
+    """
+    slot, file = task
+    result = retrieve(file)
+    if result is None:
+        return None
+    ScratchStore(directory).write(slot, result)
+    return slot
+
+
+def retrieve_to_scratch(files, directory, n_workers=None, executor=None,
+                        **kwargs):
+    """
+    Retrieves radar files into a scratch store, one slot per file.
+
+    An existing store in directory made for the same files, in the same
+    order, and heights is resumed, skipping the slots already filled.
+
+    Parameters
+    ----------
+    files : list
+        Radar file paths.
+    directory : str
+        Folder of the store.
+
+    Other Parameters
+    ----------------
+    n_workers : int
+        Number of worker processes. None or 1 retrieves in the calling
+        process.
+    executor : concurrent.futures.Executor
+        An existing executor to use instead of n_workers.
+    **kwargs
+        Passed on to vad.vad, e.g. vel_field, z_want, engine or qc.
+
+    Returns
+    -------
+    store : ScratchStore
+        The filled store.
+
+    """
+    files = list(files)
+    template = vad([], **kwargs)
+    if os.path.exists(os.path.join(directory, _META)):
+        store = ScratchStore(directory)
+        if (len(store) != len(files)
+                or store.files_hash != _files_hash(files)
+                or not np.array_equal(store.heights, template.hght)):
+            raise ValueError(directory + ' holds a store of other files '
+                             'or heights.')
+    else:
+        store = ScratchStore.create(directory, template.hght, len(files),
+                                    fields=template._buffer.fields,
+                                    qc=template.qc, files=files)
+    filled = store.filled
+    tasks = [(slot, file) for slot, file in enumerate(files)
+             if not filled[slot]]
+
+    fill = partial(_fill_slot, retrieve=template._retriever({}),
+                   directory=directory)
+    if executor is not None:
+        list(executor.map(fill, tasks))
+    elif n_workers is not None and n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            list(pool.map(fill, tasks))
+    else:
+        for task in tasks:
+            fill(task)
+    return ScratchStore(directory)
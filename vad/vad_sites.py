@@ -0,0 +1,283 @@
+"""
+vad.vad_sites
+=============
+Several radars processed together through one worker pool.
+
+    process_sites
+    compare_sites
+    main
+
+"""
+
+import argparse
+import glob
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xarray
+
+from .vad_index import select_files
+from .vad_profile import vad
+from .vad_quicklooks import quicklooks
+
+logger = logging.getLogger(__name__)
+
+
+def _site_files(inputs):
+    """ Sorted radar files of a glob pattern or a list of files. """
+    if isinstance(inputs, str):
+        return sorted(glob.glob(inputs, recursive=True))
+    return sorted(inputs)
+
+
+def _interleave(files):
+    """ (config, file) tasks taking a file of each radar in turn. """
+    columns = [[(config, file) for file in files[config]]
+               for config in sorted(files)]
+    return [task for row in itertools.zip_longest(*columns)
+            for task in row if task is not None]
+
+
+def process_sites(sites, file_directory=None, image_directory=None,
+                  n_workers=None, executor=None, index=True,
+                  tolerance=np.timedelta64(150, 's'), **kwargs):
+    """
+    Creates the daily VAD files of several radars at once. The files of
+    all radars are interleaved through a single worker pool and every
+    profile is routed to the daily file of its radar and date.
+
+    Parameters
+    ----------
+    sites : dict
+        Glob pattern, or list, of the radar files of each radar name found
+        in config.py, e.g. {'xsaprvadI4': '/data/I4/*.nc', ...}.
+
+    Other Parameters
+    ----------------
+    file_directory : str
+        Output folder of the VAD files. Defaults to the users home
+        directory.
+    image_directory : str
+        Output folder of the quicklooks. None skips the quicklooks.
+    n_workers : int
+        Number of worker processes shared by all radars. None or 1
+        retrieves in the calling process.
+    executor : concurrent.futures.Executor
+        An existing executor to use instead of n_workers. It is not shut
+        down.
+    index : bool
+        If True, files that are not PPI volumes are skipped from their
+        headers, see vad.vad_index.
+    tolerance : timedelta64
+        Largest time difference of the profiles paired by compare_sites.
+    **kwargs
+        Passed on to vad.vad for every radar, e.g. vel_field, z_want,
+        engine or qc.
+
+    Returns
+    -------
+    paths : dict
+        Written VAD files of each radar, in date order.
+    comparison : Dataset
+        Differences between every pair of radars, see compare_sites.
+        None for a single radar.
+
+    """
+    if file_directory is None:
+        file_directory = os.path.expanduser('~')
+    files = {}
+    for config, inputs in sites.items():
+        files[config] = _site_files(inputs)
+        if index:
+            files[config] = select_files(
+                files[config], kwargs.get('vel_field') or
+                'corrected_velocity')
+
+    # An empty vad of each radar provides its settings and retrieval.
+    templates = dict((config, vad([], **kwargs)) for config in sites)
+    retrievers = dict((config, templates[config]._retriever({}))
+                      for config in sites)
+    tasks = _interleave(files)
+
+    own_pool = executor is None and n_workers is not None and n_workers > 1
+    if own_pool:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+    try:
+        if executor is not None:
+            futures = [executor.submit(retrievers[config], file)
+                       for config, file in tasks]
+            results = (future.result() for future in futures)
+        else:
+            results = (retrievers[config](file) for config, file in tasks)
+
+        days = {}
+        for (config, file), result in zip(tasks, results):
+            if result is None:
+                continue
+            date = result['time'].strftime('%Y%m%d')
+            if (config, date) not in days:
+                days[(config, date)] = vad([], **kwargs)
+            days[(config, date)]._collect([result])
+    finally:
+        if own_pool:
+            executor.shutdown()
+
+    paths = dict((config, []) for config in sites)
+    for config, date in sorted(days):
+        day = days[(config, date)]
+        day._buffer.sort()
+        path = day.write(config, file_directory)
+        if image_directory is not None:
+            quicklooks(path, config, image_directory)
+        paths[config].append(path)
+        logger.info('Wrote %s with %d profiles', path, len(day.t))
+
+    comparison = None
+    if len(sites) > 1:
+        comparison = compare_sites(
+            dict((config, [days[key] for key in sorted(days)
+                           if key[0] == config]) for config in sites),
+            tolerance)
+    return paths, comparison
+
+
+def _profiles(vads):
+    """ Times, u and v of a list of vad objects, joined in time order. """
+    vads = [day for day in vads if len(day.t)]
+    if not vads:
+        return np.array([], dtype='datetime64[ns]'), None, None
+    times = np.concatenate([day.t for day in vads])
+    u_wind = np.ma.concatenate([day.uwind for day in vads])
+    v_wind = np.ma.concatenate([day.vwind for day in vads])
+    order = np.argsort(times, kind='mergesort')
+    return times[order], u_wind[order], v_wind[order]
+
+
+def _pair_times(times, other, tolerance):
+    """
+    Indices of the profiles of times and other closest in time, at most
+    tolerance apart.
+    """
+    if len(times) == 0 or len(other) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    after = np.clip(np.searchsorted(other, times), 0, len(other) - 1)
+    before = np.clip(after - 1, 0, len(other) - 1)
+    closest = np.where(np.abs(other[before] - times)
+                       < np.abs(other[after] - times), before, after)
+    paired = np.abs(other[closest] - times) <= np.timedelta64(tolerance)
+    return np.flatnonzero(paired), closest[paired]
+
+
+def compare_sites(vads, tolerance=np.timedelta64(150, 's')):
+    """
+    Per height differences between the winds of every pair of radars,
+    from profiles closest in time and at most tolerance apart.
+
+    Parameters
+    ----------
+    vads : dict
+        A vad object, or list of them, of each radar name. All must share
+        the same heights.
+    tolerance : timedelta64, optional
+        Largest time difference of paired profiles.
+
+    Returns
+    -------
+    comparison : Dataset
+        For each pair of radars, named 'first-second', and height: the
+        number of paired valid winds, count, the mean u_bias and v_bias of
+        the first minus the second radar, and the RMS vector difference
+        rms_difference.
+
+    """
+    configs = sorted(vads)
+    profiles = {}
+    height = None
+    for config in configs:
+        days = vads[config]
+        if not isinstance(days, (list, tuple)):
+            days = [days]
+        for day in days:
+            if height is None:
+                height = day.hght
+            elif not np.array_equal(day.hght, height):
+                raise ValueError('The radars must share the same heights.')
+        profiles[config] = _profiles(days)
+
+    pairs = list(itertools.combinations(configs, 2))
+    shape = (len(pairs), len(height))
+    count = np.zeros(shape, dtype=np.int32)
+    u_bias, v_bias, rms = (np.full(shape, np.nan) for _ in range(3))
+    for i, (first, second) in enumerate(pairs):
+        times, u_first, v_first = profiles[first]
+        other, u_second, v_second = profiles[second]
+        index, other_index = _pair_times(times, other, tolerance)
+        if len(index) == 0:
+            continue
+        du = u_first[index] - u_second[other_index]
+        dv = v_first[index] - v_second[other_index]
+        valid = ~(np.ma.getmaskarray(du) | np.ma.getmaskarray(dv))
+        count[i] = valid.sum(axis=0)
+        has = count[i] > 0
+        u_bias[i, has] = np.ma.mean(du, axis=0)[has]
+        v_bias[i, has] = np.ma.mean(dv, axis=0)[has]
+        rms[i, has] = np.ma.sqrt(np.ma.mean(du ** 2 + dv ** 2,
+                                            axis=0))[has]
+
+    dims = ['pair', 'height']
+    return xarray.Dataset(
+        {'count': (dims, count,
+                   {'long_name': 'Number of paired valid winds'}),
+         'u_bias': (dims, u_bias,
+                    {'units': 'm/s', 'long_name': 'Mean eastward wind '
+                                                  'difference'}),
+         'v_bias': (dims, v_bias,
+                    {'units': 'm/s', 'long_name': 'Mean northward wind '
+                                                  'difference'}),
+         'rms_difference': (dims, rms,
+                            {'units': 'm/s', 'long_name': 'RMS vector '
+                                                          'wind difference'})},
+        coords={'pair': [first + '-' + second for first, second in pairs],
+                'height': height},
+        attrs={'tolerance': str(pd.Timedelta(tolerance))})
+
+
+def main(argv=None):
+    """ Command line entry point, see vad_sites --help. """
+    parser = argparse.ArgumentParser(
+        description='Create daily VAD files of several radars through one '
+                    'shared worker pool.')
+    parser.add_argument('sites', nargs='+', metavar='CONFIG=GLOB',
+                        help='Radar name found in config.py and the glob '
+                             'pattern of its radar files.')
+    parser.add_argument('-o', '--file-directory', default=None,
+                        help='Output folder of the daily VAD files.')
+    parser.add_argument('-i', '--image-directory', default=None,
+                        help='Output folder of the quicklooks.')
+    parser.add_argument('-n', '--n-workers', type=int, default=1,
+                        help='Number of worker processes.')
+    parser.add_argument('--engine', default=None,
+                        help="VAD engine, 'pyart' or 'native'.")
+    parser.add_argument('--comparison', default=None,
+                        help='NetCDF path of the cross-site comparison.')
+    args = parser.parse_args(argv)
+
+    sites = {}
+    for site in args.sites:
+        config, _, pattern = site.partition('=')
+        if not pattern:
+            parser.error('Sites are given as CONFIG=GLOB, not ' + site)
+        sites[config] = pattern
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    _, comparison = process_sites(
+        sites, file_directory=args.file_directory,
+        image_directory=args.image_directory, n_workers=args.n_workers,
+        engine=args.engine)
+    if comparison is not None and args.comparison is not None:
+        comparison.to_netcdf(args.comparison)
@@ -0,0 +1,178 @@
+"""
+vad.vad_timing
+==============
+Per stage and per file timing of the VAD pipeline.
+
+    StageTimer
+    peak_memory
+
+A vad object keeps its timings in ``vad.timing``, and quicklooks and
+quicklooks_batch record into a StageTimer given as ``timer``.
+
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_memory():
+    """
+    Peak resident memory of the calling process in bytes, or None where
+    the resource module is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    if sys.platform != 'darwin':
+        peak *= 1024
+    return int(peak)
+
+
+class StageTimer(object):
+    """
+    Accumulates the wall time, bytes and calls of named pipeline stages,
+    e.g. 'read', 'retrieve' or 'write', and a record of every file.
+
+    Stages are timed with ``with timer.stage('write'):`` or added from
+    times measured elsewhere, e.g. in a worker process, with add.
+
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.files = []
+        self._peak_memory = None
+
+    @contextmanager
+    def stage(self, name, nbytes=0):
+        """ Times the enclosed block as a call of stage name. """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start, nbytes)
+
+    def add(self, name, seconds, nbytes=0, count=1):
+        """ Adds count calls of stage name taking seconds in total. """
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'bytes': 0,
+                                              'count': 0})
+        stage['seconds'] += seconds
+        stage['bytes'] += int(nbytes)
+        stage['count'] += count
+
+    def add_file(self, record):
+        """
+        Adds the timing record of a file. Its stage times, given as
+        record['stages'], are added to the totals.
+        """
+        self.files.append(record)
+        for name, seconds in record.get('stages', {}).items():
+            self.add(name, seconds, record.get('bytes', 0)
+                     if name == 'read' else 0)
+        self.update_peak_memory(record.get('peak_memory'))
+
+    def update_peak_memory(self, peak=None):
+        """ Raises the peak memory to peak, or to this process's peak. """
+        if peak is None:
+            peak = peak_memory()
+        if peak is not None:
+            self._peak_memory = max(self._peak_memory or 0, peak)
+
+    def merge(self, other):
+        """ Adds the stages, files and peak memory of another timer. """
+        for name, stage in other.stages.items():
+            self.add(name, stage['seconds'], stage['bytes'], stage['count'])
+        self.files.extend(other.files)
+        self.update_peak_memory(other._peak_memory)
+
+    def report(self):
+        """
+        Timings as a dict of stages, each with seconds, bytes, count and
+        throughput in bytes per second, the file records and the peak
+        memory in bytes of this and any worker processes.
+        """
+        self.update_peak_memory()
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            if stage['seconds'] > 0:
+                stage['throughput'] = stage['bytes'] / stage['seconds']
+            else:
+                stage['throughput'] = None
+            stages[name] = stage
+        return {'stages': stages, 'files': list(self.files),
+                'peak_memory': self._peak_memory}
+
+    def to_json(self, path=None):
+        """ The report as JSON, also written to path if given. """
+        text = json.dumps(self.report(), indent=1, sort_keys=True,
+                          default=str)
+        if path is not None:
+            with open(path, 'w') as json_file:
+                json_file.write(text)
+        return text
+
+    def log(self, log=None, level=logging.INFO):
+        """ Logs one line per stage to log, by default this module's. """
+        if log is None:
+            log = logger
+        report = self.report()
+        for name in sorted(report['stages']):
+            stage = report['stages'][name]
+            log.log(level, '%s: %.3f s, %d calls, %d bytes', name,
+                    stage['seconds'], stage['count'], stage['bytes'])
+        if report['peak_memory'] is not None:
+            log.log(level, 'peak memory: %d bytes', report['peak_memory'])
+
+    def write_prometheus(self, path, prefix='vad', labels=None):
+        """
+        Writes the totals in the Prometheus text format, e.g. for the node
+        exporter textfile collector. The file is replaced atomically.
+
+        Parameters
+        ----------
+        path : str
+            Path of the .prom file.
+        prefix : str, optional
+            Prefix of the metric names.
+        labels : dict, optional
+            Labels added to every metric, e.g. {'site': 'I5'}.
+
+        """
+        labels = dict(labels or {})
+        report = self.report()
+
+        def metric(name, value, extra=None):
+            values = dict(labels, **(extra or {}))
+            text = ','.join(key + '="' + str(values[key]) + '"'
+                            for key in sorted(values))
+            if text:
+                text = '{' + text + '}'
+            return prefix + '_' + name + text + ' ' + repr(float(value))
+
+        lines = []
+        for name, kind in [('stage_seconds_total', 'seconds'),
+                           ('stage_bytes_total', 'bytes'),
+                           ('stage_calls_total', 'count')]:
+            lines.append('# TYPE ' + prefix + '_' + name + ' counter')
+            for stage in sorted(report['stages']):
+                lines.append(metric(name, report['stages'][stage][kind],
+                                    {'stage': stage}))
+        if report['peak_memory'] is not None:
+            lines.append('# TYPE ' + prefix + '_peak_memory_bytes gauge')
+            lines.append(metric('peak_memory_bytes', report['peak_memory']))
+        with open(path + '.tmp', 'w') as prom_file:
+            prom_file.write('\n'.join(lines) + '\n')
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,245 @@
+"""
+vad.vad_watch
+=============
+Live VAD production from a directory of incoming radar files.
+
+    DirectoryWatcher
+    main
+
+"""
+
+import argparse
+import glob
+import logging
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .vad_index import select_files
+from .vad_profile import vad, _daily_path, _read_times
+from .vad_quicklooks import quicklooks
+
+logger = logging.getLogger(__name__)
+
+# ARM file names carry the volume start as <datastream>.YYYYMMDD.HHMMSS.
+_ARM_DATE = re.compile(r'\.(\d{8})\.\d{6}\.')
+
+
+def _file_date(file):
+    """ Date of a file from its ARM file name, or None if not found. """
+    match = _ARM_DATE.search(os.path.basename(file))
+    if match is None:
+        return None
+    return match.group(1)
+
+
+class DirectoryWatcher(object):
+    """
+    Polls a directory for newly landed radar files and incrementally
+    updates the daily VAD NetCDF files and quicklooks.
+
+    Parameters
+    ----------
+    input_directory : str
+        Folder the radar files land in.
+    config : str
+        A string of the radar name found from config.py.
+    file_directory : str, optional
+        Folder of the daily VAD NetCDF files. Defaults to the users home
+        directory.
+    image_directory : str, optional
+        Folder of the quicklook images. None skips the quicklooks.
+    pattern : str, optional
+        Glob pattern of the radar files within input_directory.
+    settle : float, optional
+        Seconds a file must go unmodified before it is processed, so
+        files still being copied in are left for the next poll.
+    executor : concurrent.futures.Executor, optional
+        Executor the retrievals are submitted to. None retrieves in the
+        calling process.
+    quarantine_directory : str, optional
+        Folder files that fail to process are moved to. None leaves them
+        in place, they are still not processed again.
+    **kwargs
+        Passed on to vad.vad, e.g. vel_field, z_want or engine.
+
+    """
+
+    def __init__(self, input_directory, config, file_directory=None,
+                 image_directory=None, pattern='*.nc', settle=5.0,
+                 executor=None, quarantine_directory=None, **kwargs):
+        self.input_directory = input_directory
+        self.config = config
+        self.file_directory = file_directory
+        self.image_directory = image_directory
+        self.pattern = pattern
+        self.settle = settle
+        self.executor = executor
+        self.quarantine_directory = quarantine_directory
+        self.kwargs = kwargs
+        self.seen = set()
+
+    def poll(self):
+        """ Returns the sorted list of settled files not yet processed. """
+        files = set(glob.glob(os.path.join(self.input_directory,
+                                           self.pattern)))
+        # Forget files that have been removed so seen does not grow forever.
+        self.seen &= files
+        now = time.time()
+        ready = []
+        for file in files - self.seen:
+            try:
+                modified = os.path.getmtime(file)
+            except OSError:
+                continue
+            if now - modified >= self.settle:
+                ready.append(file)
+        ready.sort()
+        return ready
+
+    def _daily_times(self, date):
+        """ Times already in the daily VAD file of date, if any. """
+        if date is None:
+            return None
+        path = _daily_path(self.config, self.file_directory, date)
+        if not os.path.exists(path):
+            return None
+        return _read_times(path)
+
+    def process(self, files):
+        """
+        Retrieves the VADs of files and appends them to their daily files.
+        Files that are not PPI volumes, or whose volumes are already in
+        their daily file, are skipped from their headers before the full
+        read. Returns the list of daily VAD files that were updated.
+
+        If a day fails, e.g. on a truncated volume, its files are retried
+        one at a time and those still failing are logged, quarantined and
+        not processed again, so the watcher keeps running.
+        """
+        groups = {}
+        for file in files:
+            groups.setdefault(_file_date(file), []).append(file)
+
+        paths = []
+        for date in sorted(groups, key=str):
+            try:
+                path = self._process_day(date, groups[date])
+            except Exception:
+                logger.exception('Failed to process %d files of %s, '
+                                 'retrying them one at a time',
+                                 len(groups[date]), date)
+                path = None
+                for file in groups[date]:
+                    try:
+                        path = self._process_day(date, [file]) or path
+                    except Exception:
+                        logger.exception('Failed to process %s', file)
+                        self._quarantine(file)
+            if path is not None and path not in paths:
+                paths.append(path)
+        self.seen.update(files)
+        return paths
+
+    def _process_day(self, date, files):
+        """
+        Appends the VADs of the files of a date to its daily file and
+        redraws its quicklook. Returns the daily file, or None if no file
+        was usable.
+        """
+        vel_field = self.kwargs.get('vel_field')
+        if vel_field is None:
+            vel_field = 'corrected_velocity'
+        selected = select_files(files, vel_field, self._daily_times(date))
+        if not selected:
+            return None
+        day = vad(selected, executor=self.executor, **self.kwargs)
+        if len(day.t) == 0:
+            return None
+        path = day.write(self.config, self.file_directory, append=True)
+        if self.image_directory is not None:
+            quicklooks(path, self.config, self.image_directory)
+        return path
+
+    def _quarantine(self, file):
+        """ Moves a file that failed to the quarantine directory. """
+        if self.quarantine_directory is None:
+            return
+        try:
+            if not os.path.isdir(self.quarantine_directory):
+                os.makedirs(self.quarantine_directory)
+            shutil.move(file, os.path.join(self.quarantine_directory,
+                                           os.path.basename(file)))
+        except OSError:
+            logger.exception('Failed to quarantine %s', file)
+
+    def run(self, interval=10.0, max_cycles=None):
+        """
+        Polls and processes every interval seconds until interrupted,
+        or for max_cycles polls if given.
+        """
+        cycle = 0
+        while max_cycles is None or cycle < max_cycles:
+            start = time.time()
+            files = self.poll()
+            if files:
+                paths = self.process(files)
+                logger.info('Processed %d files into %s in %.1f s',
+                            len(files), ', '.join(paths),
+                            time.time() - start)
+            cycle += 1
+            if max_cycles is None or cycle < max_cycles:
+                time.sleep(max(0.0, interval - (time.time() - start)))
+
+
+def main(argv=None):
+    """ Command line entry point, see vad_watch --help. """
+    parser = argparse.ArgumentParser(
+        description='Watch a directory for radar files and produce '
+                    'daily VAD files and quicklooks as they land.')
+    parser.add_argument('input_directory',
+                        help='Folder the radar files land in.')
+    parser.add_argument('config', help='Radar name found in config.py, '
+                                       'e.g. xsaprvadI5.')
+    parser.add_argument('-o', '--file-directory', default=None,
+                        help='Output folder of the daily VAD files.')
+    parser.add_argument('-i', '--image-directory', default=None,
+                        help='Output folder of the quicklooks.')
+    parser.add_argument('-p', '--pattern', default='*.nc',
+                        help='Glob pattern of the radar files.')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='Seconds between polls.')
+    parser.add_argument('--settle', type=float, default=5.0,
+                        help='Seconds a file must be unmodified for.')
+    parser.add_argument('-n', '--n-workers', type=int, default=1,
+                        help='Number of retrieval worker processes.')
+    parser.add_argument('--vel-field', default=None,
+                        help='Velocity field used for the VAD.')
+    parser.add_argument('--engine', default=None,
+                        help="VAD engine, 'pyart' or 'native'.")
+    parser.add_argument('-q', '--quarantine-directory', default=None,
+                        help='Folder files that fail to process are moved '
+                             'to.')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    executor = None
+    if args.n_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=args.n_workers)
+    watcher = DirectoryWatcher(
+        args.input_directory, args.config,
+        file_directory=args.file_directory,
+        image_directory=args.image_directory, pattern=args.pattern,
+        settle=args.settle, executor=executor,
+        quarantine_directory=args.quarantine_directory,
+        vel_field=args.vel_field, engine=args.engine)
+    try:
+        watcher.run(interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,170 @@
+"""
+vad.vad_zarr
+============
+Zarr store output holding every VAD profile of a radar.
+
+    create_zarr
+    write_zarr
+
+A month, or a campaign, of profiles is then read with a single lazy
+``xarray.open_zarr(store)``.
+
+"""
+
+import os
+
+import numpy as np
+import xarray
+
+from .config import get_metadata
+from .default_config import _CHUNK_TIMES
+
+_TIME_UNITS = 'seconds since 1970-01-01 00:00:00'
+_PROFILES = ['u_wind', 'v_wind', 'speed', 'direction']
+
+
+def _encoding(nheight, chunk_times):
+    """ Zarr encoding of the time and wind variables. """
+    encoding = dict((name, {'dtype': 'float32',
+                            'chunks': (chunk_times, nheight)})
+                    for name in _PROFILES)
+    for name in ['time', 'time_offset']:
+        encoding[name] = {'units': _TIME_UNITS, 'calendar': 'gregorian',
+                          'dtype': 'int64', 'chunks': (chunk_times,)}
+    return encoding
+
+
+def _default_store(config):
+    """ <datastream>.zarr in the users home directory. """
+    return os.path.join(os.path.expanduser('~'),
+                        get_metadata(config)['datastream'] + '.zarr')
+
+
+def _time_variables(ds):
+    """
+    The variables of ds along time, which are the ones appended. Their
+    _FillValue attributes are dropped as the store already encodes them.
+    """
+    ds = ds.drop_vars([name for name in ds.variables
+                       if 'time' not in ds[name].dims])
+    for name in ds.variables:
+        ds[name].attrs.pop('_FillValue', None)
+    return ds
+
+
+def _zarr_dataset(vad, config):
+    """
+    The dataset of vad as stored in a Zarr store. The flag_counts of
+    qc_flag are dropped, as they would only count the profiles of the
+    latest write, and parallel region writes cannot keep a total of the
+    store. They are found from the stored qc_flag instead.
+    """
+    ds = vad._to_dataset(config)
+    if 'qc_flag' in ds:
+        ds['qc_flag'].attrs.pop('flag_counts')
+        ds['qc_flag'].attrs['comment'] = ('Winds are masked where any flag '
+                                          'is set.')
+    return ds
+
+
+def create_zarr(template, config, times, store=None,
+                chunk_times=_CHUNK_TIMES):
+    """
+    Creates a Zarr store with a slot for every time in times, so that
+    workers can fill disjoint slots in parallel with
+    vad.write_zarr(region=True).
+
+    Workers do not lock the store, so each should write whole chunks of
+    chunk_times slots, e.g. by giving each worker a multiple of
+    chunk_times consecutive volumes.
+
+    Parameters
+    ----------
+    template : vad
+        Any retrieved vad object of the radar. It provides the heights,
+        location and attributes, and its profiles are written into the
+        slots with matching times.
+    config : str
+        A string of the radar name found from config.py.
+    times : array
+        Times of every profile the store will hold, in whole seconds.
+
+    Other Parameters
+    ----------------
+    store : str
+        Path of the Zarr store. Defaults to <datastream>.zarr in the users
+        home directory. It must not exist yet.
+    chunk_times : int
+        Number of profiles per chunk along time.
+
+    Returns
+    -------
+    store : str
+        Path of the Zarr store.
+
+    """
+    if store is None:
+        store = _default_store(config)
+    times = np.sort(np.asarray(times, dtype='datetime64[ns]'))
+    ds = _zarr_dataset(template, config).reindex(time=times)
+    ds['time_offset'] = xarray.Variable('time', times,
+                                        attrs=ds['time_offset'].attrs)
+    ds.to_zarr(store, mode='w-',
+               encoding=_encoding(len(template.hght), chunk_times))
+    return store
+
+
+def write_zarr(vad, config, store=None, region=False):
+    """
+    Writes the profiles of a vad object to a radar's Zarr store.
+
+    Parameters
+    ----------
+    vad : vad
+        Retrieved vad object.
+    config : str
+        A string of the radar name found from config.py.
+
+    Other Parameters
+    ----------------
+    store : str
+        Path of the Zarr store. Defaults to <datastream>.zarr in the users
+        home directory.
+    region : bool
+        If False, the store is created if needed and profiles whose times
+        are not yet stored are appended along time. If True, the profiles
+        are written into their slots of a store made by create_zarr, which
+        must hold the profile times as consecutive slots.
+
+    Returns
+    -------
+    store : str
+        Path of the Zarr store.
+
+    """
+    if store is None:
+        store = _default_store(config)
+    ds = _zarr_dataset(vad, config)
+
+    if not region and not os.path.exists(store):
+        ds.to_zarr(store, mode='w-',
+                   encoding=_encoding(len(vad.hght), _CHUNK_TIMES))
+        return store
+
+    with xarray.open_zarr(store) as stored:
+        stored_times = stored.time.values
+
+    if region:
+        start = int(np.searchsorted(stored_times, vad.t[0]))
+        stop = start + len(vad.t)
+        if not np.array_equal(stored_times[start:stop], vad.t):
+            raise ValueError('The profile times are not consecutive slots '
+                             'of ' + store + ', see create_zarr.')
+        _time_variables(ds).to_zarr(store, region={'time': slice(start,
+                                                                  stop)})
+    else:
+        new = np.flatnonzero(~np.isin(vad.t, stored_times))
+        if len(new):
+            _time_variables(ds).isel(time=new).to_zarr(store,
+                                                       append_dim='time')
+    return store